@@ -1,286 +1,178 @@
+import argparse
+import collections
+import ctypes
+import ctypes.util
+import difflib
+import fnmatch
+import functools
+import gzip
+import hashlib
+import html
+import http.client
+import http.server
+import importlib.util
+import io
+import json
+import os
+import pickle
+import re
+import select
+import shlex
+import shutil
+import signal
+import struct
+import subprocess
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import ExitStack, contextmanager
+from functools import partial
 from pathlib import Path
+from xml.sax.saxutils import escape as xml_escape
+
+try:
+    import fcntl
+    import resource
+except ImportError:  # Windows
+    fcntl = resource = None
+try:
+    import brotli
+except ImportError:  # optional: analyze reports no brotli sizes without it
+    brotli = None
 
 ROOT = Path("tryatlabs")
 
-# --------------------------
-# DIRECTORIES (same structure)
-# --------------------------
-DIRS = [
-    "apps/main/public/assets/icons",
-    "apps/main/src/app/constants",
-    "apps/main/src/app/providers",
-    "apps/main/src/routes",
-    "apps/main/src/pages",
-    "apps/main/src/components/layout",
-    "apps/main/src/components/common",
-    "apps/main/src/seo/JsonLd",
-    "apps/main/src/lib/analytics",
-    "apps/main/src/lib/storage",
-    "apps/main/src/styles",
-    "apps/main/scripts",
-
-    "apps/tools/public/assets",
-    "apps/tools/src/app",
-    "apps/tools/src/routes",
-    "apps/tools/src/data",
-    "apps/tools/src/pages/Home",
-    "apps/tools/src/pages/Category",
-    "apps/tools/src/pages/Tool",
-    "apps/tools/src/pages/Static",
-    "apps/tools/src/tools/shared",
-    "apps/tools/src/tools/pdf-to-jpg",
-    "apps/tools/src/tools/jpg-png-to-pdf",
-    "apps/tools/src/tools/image-resize",
-    "apps/tools/src/tools/image-compress",
-    "apps/tools/src/tools/text-case-converter",
-    "apps/tools/src/tools/word-counter",
-    "apps/tools/src/tools/qr-generator",
-    "apps/tools/src/tools/uuid-generator",
-    "apps/tools/src/workers",
-    "apps/tools/src/seo/JsonLd",
-    "apps/tools/src/components/layout",
-    "apps/tools/src/components/common",
-    "apps/tools/src/components/ads",
-    "apps/tools/src/lib/analytics",
-    "apps/tools/src/lib/storage",
-    "apps/tools/src/styles",
-    "apps/tools/scripts",
-
-    "apps/pdf/public",
-    "apps/pdf/src/app",
-    "apps/pdf/src/routes",
-    "apps/pdf/src/data",
-    "apps/pdf/src/pages",
-    "apps/pdf/src/tools/shared",
-    "apps/pdf/src/tools/merge-pdf",
-    "apps/pdf/src/tools/split-pdf",
-    "apps/pdf/src/tools/compress-pdf",
-    "apps/pdf/src/tools/rotate-pages",
-    "apps/pdf/src/tools/reorder-pages",
-    "apps/pdf/src/tools/extract-pages",
-    "apps/pdf/src/tools/add-watermark",
-    "apps/pdf/src/tools/add-page-numbers",
-    "apps/pdf/src/workers",
-    "apps/pdf/src/seo",
-    "apps/pdf/src/components",
-    "apps/pdf/src/styles",
-    "apps/pdf/scripts",
-
-    "apps/image/public",
-    "apps/image/src/app",
-    "apps/image/src/routes",
-    "apps/image/src/data",
-    "apps/image/src/pages",
-    "apps/image/src/tools/shared",
-    "apps/image/src/tools/resize-image",
-    "apps/image/src/tools/compress-image",
-    "apps/image/src/tools/convert-image",
-    "apps/image/src/tools/crop-image",
-    "apps/image/src/tools/batch-processor",
-    "apps/image/src/tools/social-presets",
-    "apps/image/src/canvas",
-    "apps/image/src/workers",
-    "apps/image/src/seo",
-    "apps/image/src/components",
-    "apps/image/src/styles",
-    "apps/image/scripts",
-
-    "apps/text/public",
-    "apps/text/src/app",
-    "apps/text/src/routes",
-    "apps/text/src/data",
-    "apps/text/src/pages",
-    "apps/text/src/tools/shared",
-    "apps/text/src/tools/case-converter",
-    "apps/text/src/tools/word-counter",
-    "apps/text/src/tools/remove-spaces",
-    "apps/text/src/tools/slug-generator",
-    "apps/text/src/tools/markdown-preview",
-    "apps/text/src/tools/diff-checker",
-    "apps/text/src/utils",
-    "apps/text/src/seo",
-    "apps/text/src/components",
-    "apps/text/src/styles",
-    "apps/text/scripts",
-
-    "apps/dev/public",
-    "apps/dev/src/app",
-    "apps/dev/src/routes",
-    "apps/dev/src/data",
-    "apps/dev/src/pages",
-    "apps/dev/src/tools/shared",
-    "apps/dev/src/tools/base64-tool",
-    "apps/dev/src/tools/jwt-decoder",
-    "apps/dev/src/tools/hash-generator",
-    "apps/dev/src/tools/uuid-generator",
-    "apps/dev/src/tools/timestamp-generator",
-    "apps/dev/src/tools/url-encode-decode",
-    "apps/dev/src/crypto",
-    "apps/dev/src/seo",
-    "apps/dev/src/components",
-    "apps/dev/src/styles",
-    "apps/dev/scripts",
-
-    "packages/core-ui/src/layout",
-    "packages/core-ui/src/ui",
-    "packages/core-ui/src/common",
-    "packages/core-ui/src/theme",
-
-    "packages/core-seo/src/JsonLd",
-    "packages/core-seo/src/build",
-
-    "packages/core-ads/src",
-    "packages/core-utils/src/registry",
-    "packages/core-utils/src/file",
-    "packages/core-utils/src/perf",
-    "packages/core-utils/src/strings",
-
-    "configs",
-    "scripts",
-    "docs",
-]
+# Hash manifest of generated files, stored under ROOT (used by --incremental)
+MANIFEST_NAME = ".tryatlabs-manifest.json"
 
-# --------------------------
-# FILES (same structure, but fix the invalid "a / b" line)
-# --------------------------
-FILES = [
-    ".env.example",
-    ".gitignore",
-    ".editorconfig",
-    "eslint.config.js",
-    "prettier.config.js",
-    "package.json",
-    "README.md",
-
-    # IMPORTANT FIX: create both as separate files (Windows-safe)
-    "pnpm-workspace.yaml",
-    "yarn-workspaces",
-
-    # main app (important)
-    "apps/main/index.html",
-    "apps/main/vite.config.js",
-    "apps/main/package.json",
-    "apps/main/README.md",
-    "apps/main/.env",
-    "apps/main/public/favicon.ico",
-    "apps/main/public/robots.txt",
-    "apps/main/public/sitemap.xml",
-    "apps/main/public/ads.txt",
-    "apps/main/public/assets/logo.svg",
-    "apps/main/public/assets/og-default.png",
-    "apps/main/public/assets/icons/apple-touch-icon.png",
-    "apps/main/public/assets/icons/icon-192.png",
-    "apps/main/src/app/App.jsx",
-    "apps/main/src/app/main.jsx",
-    "apps/main/src/app/constants/brand.js",
-    "apps/main/src/app/constants/urls.js",
-    "apps/main/src/app/constants/seoDefaults.js",
-    "apps/main/src/app/constants/env.js",
-    "apps/main/src/app/providers/HelmetProvider.jsx",
-    "apps/main/src/app/providers/AnalyticsProvider.jsx",
-    "apps/main/src/app/providers/AdsProvider.jsx",
-    "apps/main/src/routes/router.jsx",
-    "apps/main/src/pages/Home.jsx",
-    "apps/main/src/pages/Ecosystem.jsx",
-    "apps/main/src/pages/Labs.jsx",
-    "apps/main/src/pages/Studio.jsx",
-    "apps/main/src/pages/Partnerships.jsx",
-    "apps/main/src/pages/Talent.jsx",
-    "apps/main/src/pages/Contact.jsx",
-    "apps/main/src/pages/Privacy.jsx",
-    "apps/main/src/pages/Terms.jsx",
-    "apps/main/src/pages/NotFound.jsx",
-    "apps/main/src/components/layout/Header.jsx",
-    "apps/main/src/components/layout/Footer.jsx",
-    "apps/main/src/components/layout/SiteLayout.jsx",
-    "apps/main/src/seo/SeoHead.jsx",
-    "apps/main/src/lib/analytics/subdomainRedirect.js",
-    "apps/main/src/styles/globals.css",
-    "apps/main/src/styles/main-theme.css",
-
-    # tools app (important)
-    "apps/tools/index.html",
-    "apps/tools/vite.config.js",
-    "apps/tools/package.json",
-    "apps/tools/README.md",
-    "apps/tools/public/favicon.ico",
-    "apps/tools/public/robots.txt",
-    "apps/tools/public/sitemap.xml",
-    "apps/tools/public/ads.txt",
-    "apps/tools/public/assets/logo.svg",
-    "apps/tools/public/assets/og-default.png",
-    "apps/tools/src/app/App.jsx",
-    "apps/tools/src/app/main.jsx",
-    "apps/tools/src/app/site.config.js",
-    "apps/tools/src/routes/router.jsx",
-    "apps/tools/src/components/layout/ToolLayout.jsx",
-    "apps/tools/src/pages/Home/Home.jsx",
-    "apps/tools/src/pages/Category/Category.jsx",
-    "apps/tools/src/pages/Tool/Tool.jsx",
-    "apps/tools/src/pages/NotFound.jsx",
-    "apps/tools/src/pages/Static/About.jsx",
-    "apps/tools/src/pages/Static/Privacy.jsx",
-    "apps/tools/src/pages/Static/Terms.jsx",
-    "apps/tools/src/pages/Static/Contact.jsx",
-    "apps/tools/src/seo/SeoHead.jsx",
-    "apps/tools/src/styles/globals.css",
-    "apps/tools/src/styles/tools-theme.css",
-
-    # minimal placeholders for other apps so you can extend later
-    "apps/pdf/index.html",
-    "apps/pdf/vite.config.js",
-    "apps/pdf/package.json",
-    "apps/pdf/src/app/App.jsx",
-    "apps/pdf/src/app/main.jsx",
-    "apps/pdf/src/app/site.config.js",
-    "apps/pdf/src/routes/router.jsx",
-    "apps/pdf/src/pages/Home.jsx",
-    "apps/pdf/src/pages/ToolPage.jsx",
-    "apps/pdf/src/pages/NotFound.jsx",
-    "apps/pdf/src/seo/SeoHead.jsx",
-
-    "apps/image/index.html",
-    "apps/image/vite.config.js",
-    "apps/image/package.json",
-    "apps/image/src/app/App.jsx",
-    "apps/image/src/app/main.jsx",
-    "apps/image/src/app/site.config.js",
-    "apps/image/src/routes/router.jsx",
-    "apps/image/src/pages/Home.jsx",
-    "apps/image/src/pages/ToolPage.jsx",
-    "apps/image/src/pages/NotFound.jsx",
-
-    "apps/text/index.html",
-    "apps/text/vite.config.js",
-    "apps/text/package.json",
-    "apps/text/src/app/App.jsx",
-    "apps/text/src/app/main.jsx",
-    "apps/text/src/app/site.config.js",
-    "apps/text/src/routes/router.jsx",
-    "apps/text/src/pages/Home.jsx",
-    "apps/text/src/pages/ToolPage.jsx",
-    "apps/text/src/pages/NotFound.jsx",
-
-    "apps/dev/index.html",
-    "apps/dev/vite.config.js",
-    "apps/dev/package.json",
-    "apps/dev/src/app/App.jsx",
-    "apps/dev/src/app/main.jsx",
-    "apps/dev/src/app/site.config.js",
-    "apps/dev/src/routes/router.jsx",
-    "apps/dev/src/pages/Home.jsx",
-    "apps/dev/src/pages/ToolPage.jsx",
-    "apps/dev/src/pages/NotFound.jsx",
-]
+# Sibling staging tree for --staged (same filesystem as ROOT, so renames are atomic)
+STAGING_DIR = ROOT.parent / f".{ROOT.name}.staging"
+# Written into the staging tree once it is complete and durable; its presence
+# means the swap must be rolled forward, its absence that the stage is garbage
+JOURNAL_NAME = ".tryatlabs-journal.json"
+
+# --tenants: per-process memo of renders shared between tenants; bounded so
+# worker memory stays flat however many tenants a worker handles
+SHARED_RENDER_CACHE = 2048
+
+# --archive: fixed timestamp for reproducible tar/zip output (zip can't go before 1980)
+ARCHIVE_EPOCH = max(int(os.environ.get("SOURCE_DATE_EPOCH", 0)), 315532800)
+
+# verify: hashes of hand-edited files, so unchanged drift isn't re-hashed next time
+VERIFY_STATE_NAME = ".tryatlabs-verify.json"
+# directories under ROOT that belong to npm/vite/git, not to the generator
+VERIFY_SKIP_DIRS = frozenset({"node_modules", "dist", ".git", ".vite"})
+
+# dev: vite's default port for the app that owns the local overrides (.env),
+# which name the other apps' ports; server.port pins in the apps' vite configs;
+# hop-by-hop headers the proxy doesn't forward
+DEV_BASE_PORT = 5173
+ENV_URL = re.compile(r"^VITE_(\w+)_URL=(\S+)$", re.M)
+ENV_LOCAL_URL = re.compile(r"^https?://(?:localhost|127\.0\.0\.1):(\d+)/?$")
+VITE_PORT_PIN = re.compile(r"\bport\s*:\s*(\d+)")
+VITE_STRICT_PORT = re.compile(r"\bstrictPort\s*:\s*true\b")
+HOP_HEADERS = frozenset({"connection", "keep-alive", "proxy-connection", "te", "trailer", "transfer-encoding", "upgrade"})
+
+# analyze: chunk sizes by content hash plus the recorded baseline, under ROOT
+BUNDLE_STATE_NAME = ".tryatlabs-bundles.json"
+VITE_MANIFEST = ".vite/manifest.json"
+BUDGET_KEYS = ("initial_kb", "route_kb")
+# vite's content hash in chunk names (Ecosystem-B3xk_9aQ.js), dropped to match
+# a rebuilt chunk with its baseline
+CHUNK_HASH = re.compile(r"-[\w-]{8}(?=\.\w+$)")
+
+# compress: ledger of source hashes and sibling sizes under ROOT; siblings are
+# only kept when they save at least 10%, and known-compressed formats and tiny
+# files aren't tried at all
+COMPRESS_STATE_NAME = ".tryatlabs-compress.json"
+COMPRESS_MIN_RATIO = 0.9
+COMPRESS_MIN_BYTES = 256
+COMPRESSED_SUFFIXES = frozenset({
+    ".gz", ".br", ".zip", ".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".woff", ".woff2", ".mp4", ".webm",
+})
+
+# build: per-node input hashes of the last successful builds (plus the file
+# hash cache behind them), and the workspace-level files every build reads
+BUILD_STATE_NAME = ".tryatlabs-build.json"
+NPM_INSTALL = ["npm", "install", "--no-audit", "--no-fund"]
+BUILD_SHARED_INPUTS = ("package.json", "package-lock.json", "pnpm-lock.yaml", "yarn.lock", ".env", ".env.local", "configs")
+
+# watch: quiet period before a batch of changes is applied, and the poll
+# interval when inotify isn't available
+WATCH_DEBOUNCE = 0.15
+WATCH_POLL_INTERVAL = 0.5
+# inotify(7): IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+INOTIFY_MASK = 0x2 | 0x8 | 0x80 | 0x100 | 0x200
+
+# Content-addressed blob store for --link-mode hardlink/reflink; a sibling of
+# ROOT so hardlinks and reflinks stay on the same filesystem
+CAS_DIR = ROOT.parent / f".{ROOT.name}.cas"
+# ioctl(dest_fd, FICLONE, src_fd) shares extents on btrfs/XFS (Linux)
+FICLONE = 0x40049409
+
+# Thread count for the write engine (same default as ThreadPoolExecutor); 1 = serial
+DEFAULT_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+# Declarative layout (apps, tools, packages, files -> templates) and its compiled cache
+SPEC_PATH = Path(__file__).with_name("tryatlabs.spec.json")
+SPEC_CACHE_DIR = Path(__file__).with_name(".tryatlabs-cache")
+SPEC_FORMAT = 2
+SITE_VARS = ("domain", "brand", "tagline")
+
+# Sitemaps (protocol limits per file) and the per-URL lastmod ledger under ROOT
+SITEMAP_MAX_URLS = 50_000
+SITEMAP_MAX_BYTES = 50 * 1024 * 1024
+SITEMAP_LEDGER_NAME = ".tryatlabs-sitemap.json"
+SITEMAP_EXTRA = re.compile(r"(^|/)public/sitemap(-\d+)?\.xml(\.gz)?$")
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+
+# Prerender (apps/*/dist after `vite build`): the pristine Vite shell is kept
+# beside the pages since dist/index.html itself becomes the "/" page
+PRERENDER_SHELL = ".prerender-shell.html"
+PRERENDER_LEDGER = ".prerender.json"
+PRERENDER_BEGIN = "<!-- prerender -->"
+PRERENDER_END = "<!-- /prerender -->"
+JSX_RETURN = re.compile(r"return\s*\(?\s*(<.*>)\s*\)?;", re.S)
+JSX_SEO_HEAD = re.compile(r"<SeoHead\b(.*?)/>\s*", re.S)
+JSX_PROP = re.compile(r'(\w+)="([^"]*)"')
+JSX_STYLE = re.compile(r"style=\{\{(.*?)\}\}")
+JSX_STYLE_RULE = re.compile(r"""(\w+)\s*:\s*("[^"]*"|'[^']*'|[\w.%-]+)""")
+
+# Generated per-app page exports the routers import from
+PAGES_MODULE = "src/routes/pages.jsx"
+
+# Where an app's URLS constants live (rendered MAIN_URLS): redirect targets and
+# the origins resource hints point at. Redirects compile to REDIRECT_OUTPUTS.
+URLS_MODULE = "src/app/constants/urls.js"
+URLS_ENTRY = re.compile(r'(\w+): "(https?://[^"]+)"')
+REDIRECT_OUTPUTS = {"public/_redirects": "redirects", "redirects.nginx.conf": "nginx", "redirects.dev.js": "vite-redirects"}
+
+# Tool registry: the generated per-app module (beside a hand-written
+# src/tools/index.jsx, which it never replaces), per-app "tool_route" patterns,
+# the shared catalog's home, and slug words that title-case badly
+TOOLS_MODULE = "src/tools/registry.jsx"
+TOOL_ROUTES = {"/:slug": "/{slug}", "/:category/:slug": "/{category}/{slug}"}
+REGISTRY_HOME = "packages/core-utils/src/registry"
+TITLE_WORDS = {
+    "pdf": "PDF", "jpg": "JPG", "png": "PNG", "jwt": "JWT", "uuid": "UUID", "url": "URL", "qr": "QR",
+    "json": "JSON", "ocr": "OCR",
+}
+
+# Local benchmark baselines (machine specific, so they live in the ignored cache dir)
+BENCH_BASELINES = SPEC_CACHE_DIR / "bench-baselines.json"
 
 # --------------------------
-# CONTENT FOR IMPORTANT FILES
+# TEMPLATES (referenced by name from the spec)
 # --------------------------
 MAIN_INDEX_HTML = """<!DOCTYPE html>
 <html lang="en">
   <head>
     <meta charset="UTF-8" />
-    <meta name="viewport" content="width=device-width, initial-scale=1.0" />
+    <meta name="viewport" content="width=device-width, initial-scale=1.0" /><%= hints %>
   </head>
   <body>
     <div id="root"></div>
@@ -291,14 +183,59 @@ MAIN_INDEX_HTML = """<!DOCTYPE html>
 
 VITE_CONFIG = """import { defineConfig } from "vite";
 import react from "@vitejs/plugin-react";
+import { manualChunks } from "../../configs/vite.chunks.js";
 
 export default defineConfig({
   plugins: [react()],
+  build: {
+    manifest: true,
+    rollupOptions: {
+      output: { manualChunks },
+    },
+  },
+});
+"""
+
+# Shared by every app's vite.config.js
+VITE_CHUNKS = """// Framework code changes far less often than app code, so it gets its own
+// long-cached chunks; everything else is left to Rollup's default splitting.
+const VENDOR_CHUNKS = {
+  "vendor-react": ["react", "react-dom", "scheduler"],
+  "vendor-router": ["react-router", "react-router-dom", "@remix-run/router"],
+  "vendor-helmet": ["react-helmet-async", "react-fast-compare", "invariant", "shallowequal"],
+};
+
+const CHUNK_OF = Object.fromEntries(
+  Object.entries(VENDOR_CHUNKS).flatMap(([chunk, pkgs]) => pkgs.map((pkg) => [pkg, chunk]))
+);
+
+export function manualChunks(id) {
+  const i = id.lastIndexOf("node_modules/");
+  if (i === -1) return undefined;
+  const parts = id.slice(i + "node_modules/".length).split("/");
+  const pkg = parts[0].startsWith("@") ? `${parts[0]}/${parts[1]}` : parts[0];
+  return CHUNK_OF[pkg];
+}
+"""
+
+VITE_CONFIG_REDIRECTS = """import { defineConfig } from "vite";
+import react from "@vitejs/plugin-react";
+import redirects from "./redirects.dev.js";
+import { manualChunks } from "../../configs/vite.chunks.js";
+
+export default defineConfig({
+  plugins: [react(), redirects()],
+  build: {
+    manifest: true,
+    rollupOptions: {
+      output: { manualChunks },
+    },
+  },
 });
 """
 
 MAIN_PKG = """{
-  "name": "@tryatlabs/main",
+  "name": "<%= package %>",
   "private": true,
   "version": "0.0.1",
   "type": "module",
@@ -320,43 +257,22 @@ MAIN_PKG = """{
 }
 """
 
-TOOLS_PKG = MAIN_PKG.replace("@tryatlabs/main", "@tryatlabs/tools")
-PDF_PKG = MAIN_PKG.replace("@tryatlabs/main", "@tryatlabs/pdf")
-IMAGE_PKG = MAIN_PKG.replace("@tryatlabs/main", "@tryatlabs/image")
-TEXT_PKG = MAIN_PKG.replace("@tryatlabs/main", "@tryatlabs/text")
-DEV_PKG = MAIN_PKG.replace("@tryatlabs/main", "@tryatlabs/dev")
-
 MAIN_ENV = """# Local overrides so main redirects to localhost tools while developing
-VITE_TOOLS_URL=http://localhost:5174
-VITE_PDF_URL=http://localhost:5175
-VITE_IMAGE_URL=http://localhost:5176
-VITE_TEXT_URL=http://localhost:5177
-VITE_DEV_URL=http://localhost:5178
-"""
+<%= hub_env %>"""
 
 MAIN_URLS = """export const URLS = {
-  MAIN: "https://tryatlabs.com",
-  TOOLS: "https://tools.tryatlabs.com",
-  PDF: "https://pdf.tryatlabs.com",
-  IMAGE: "https://image.tryatlabs.com",
-  TEXT: "https://text.tryatlabs.com",
-  DEV: "https://dev.tryatlabs.com",
-};
+  MAIN: "https://<%= domain %>",
+<%= hub_urls %>};
 """
 
 MAIN_ENV_JS = """export const ENV = {
   MAIN_URL: import.meta.env.VITE_MAIN_URL,
-  TOOLS_URL: import.meta.env.VITE_TOOLS_URL,
-  PDF_URL: import.meta.env.VITE_PDF_URL,
-  IMAGE_URL: import.meta.env.VITE_IMAGE_URL,
-  TEXT_URL: import.meta.env.VITE_TEXT_URL,
-  DEV_URL: import.meta.env.VITE_DEV_URL,
-};
+<%= hub_env_js %>};
 """
 
 MAIN_BRAND = """export const BRAND = {
-  name: "TryAtLabs",
-  tagline: "A frontend-first ecosystem of fast tools & products.",
+  name: "<%= brand %>",
+  tagline: "<%= tagline %>",
 };
 """
 
@@ -364,7 +280,7 @@ MAIN_SEO_DEFAULTS = """import { BRAND } from "./brand";
 
 export const SEO_DEFAULTS = {
   title: `${BRAND.name} — ${BRAND.tagline}`,
-  description: "TryAtLabs is a hub for tools, PDF, image, text and developer utilities.",
+  description: "<%= brand %> is a hub for tools, PDF, image, text and developer utilities.",
 };
 """
 
@@ -397,12 +313,7 @@ const pick = (fallback, override) => (override && override.trim() ? override : f
 
 const BASE = {
   MAIN: pick(URLS.MAIN, ENV.MAIN_URL),
-  TOOLS: pick(URLS.TOOLS, ENV.TOOLS_URL),
-  PDF: pick(URLS.PDF, ENV.PDF_URL),
-  IMAGE: pick(URLS.IMAGE, ENV.IMAGE_URL),
-  TEXT: pick(URLS.TEXT, ENV.TEXT_URL),
-  DEV: pick(URLS.DEV, ENV.DEV_URL),
-};
+<%= hub_bases %>};
 
 export function goTo(target, path = "/", queryString = "") {
   const base = BASE[target];
@@ -419,7 +330,7 @@ import { Helmet } from "react-helmet-async";
 import { SEO_DEFAULTS } from "../app/constants/seoDefaults";
 
 function getCanonicalBase() {
-  if (typeof window === "undefined") return "https://tryatlabs.com";
+  if (typeof window === "undefined") return "https://<%= host %>";
   return `${window.location.protocol}//${window.location.host}`;
 }
 
@@ -446,16 +357,18 @@ MAIN_ROUTER = """import React from "react";
 import { createBrowserRouter, Navigate } from "react-router-dom";
 
 import SiteLayout from "../components/layout/SiteLayout";
-import Home from "../pages/Home";
-import Ecosystem from "../pages/Ecosystem";
-import Labs from "../pages/Labs";
-import Studio from "../pages/Studio";
-import Partnerships from "../pages/Partnerships";
-import Talent from "../pages/Talent";
-import Contact from "../pages/Contact";
-import Privacy from "../pages/Privacy";
-import Terms from "../pages/Terms";
-import NotFound from "../pages/NotFound";
+import {
+  Home,
+  Ecosystem,
+  Labs,
+  Studio,
+  Partnerships,
+  Talent,
+  Contact,
+  Privacy,
+  Terms,
+  NotFound,
+} from "./pages";
 
 import { goTo } from "../lib/analytics/subdomainRedirect";
 
@@ -479,13 +392,7 @@ export const router = createBrowserRouter([
       { path: "/contact", element: <Contact /> },
       { path: "/privacy", element: <Privacy /> },
       { path: "/terms", element: <Terms /> },
-
-      { path: "/tools", element: <SubdomainRedirect target="TOOLS" /> },
-      { path: "/pdf", element: <SubdomainRedirect target="PDF" /> },
-      { path: "/image", element: <SubdomainRedirect target="IMAGE" /> },
-      { path: "/text", element: <SubdomainRedirect target="TEXT" /> },
-      { path: "/dev", element: <SubdomainRedirect target="DEV" /> },
-
+<%= hub_routes %>
       { path: "/home", element: <Navigate to="/" replace /> },
       { path: "*", element: <NotFound /> }
     ],
@@ -586,33 +493,28 @@ import { goTo } from "../lib/analytics/subdomainRedirect";
 export default function Home() {
   return (
     <div>
-      <SeoHead title="TryAtLabs — Main Hub" path="/" />
-      <h1>TryAtLabs</h1>
+      <SeoHead title="<%= brand %> — Main Hub" path="/" />
+      <h1><%= brand %></h1>
       <p>Select a product hub:</p>
       <div style={{ display: "flex", gap: 10, flexWrap: "wrap" }}>
-        <button onClick={() => goTo("TOOLS", "/")}>Tools</button>
-        <button onClick={() => goTo("PDF", "/")}>PDF</button>
-        <button onClick={() => goTo("IMAGE", "/")}>Image</button>
-        <button onClick={() => goTo("TEXT", "/")}>Text</button>
-        <button onClick={() => goTo("DEV", "/")}>Dev</button>
-      </div>
+<%= hub_buttons %>      </div>
     </div>
   );
 }
 """
 
-PLACEHOLDER_PAGE = lambda title, path: f"""import React from "react";
+PLACEHOLDER_PAGE = """import React from "react";
 import SeoHead from "../seo/SeoHead";
 
-export default function Page() {{
+export default function Page() {
   return (
     <div>
-      <SeoHead title="{title}" path="{path}" />
-      <h2>{title}</h2>
+      <SeoHead title="<%= title %>" path="<%= path %>" />
+      <h2><%= title %></h2>
       <p>Placeholder page.</p>
     </div>
   );
-}}
+}
 """
 
 MAIN_NOTFOUND = """import React from "react";
@@ -621,7 +523,7 @@ import SeoHead from "../seo/SeoHead";
 export default function NotFound() {
   return (
     <div>
-      <SeoHead title="Not Found — TryAtLabs" path="/404" />
+      <SeoHead title="Not Found — <%= brand %>" path="/404" />
       <h2>404 — Page not found</h2>
       <p>This page doesn’t exist.</p>
     </div>
@@ -630,11 +532,11 @@ export default function NotFound() {
 """
 
 TOOLS_SITE_CONFIG = """export const SITE = {
-  name: "TryAtLabs Tools",
+  name: "<%= brand %> Tools",
   canonicalBase:
     typeof window !== "undefined"
       ? `${window.location.protocol}//${window.location.host}`
-      : "https://tools.tryatlabs.com",
+      : "https://<%= host %>",
 };
 """
 
@@ -686,14 +588,7 @@ TOOLS_ROUTER = """import React from "react";
 import { createBrowserRouter, Navigate } from "react-router-dom";
 
 import ToolLayout from "../components/layout/ToolLayout";
-import Home from "../pages/Home/Home";
-import Category from "../pages/Category/Category";
-import Tool from "../pages/Tool/Tool";
-import About from "../pages/Static/About";
-import Privacy from "../pages/Static/Privacy";
-import Terms from "../pages/Static/Terms";
-import Contact from "../pages/Static/Contact";
-import NotFound from "../pages/NotFound";
+import { Home, Category, Tool, About, Privacy, Terms, Contact, NotFound } from "./pages";
 
 export const router = createBrowserRouter([
   {
@@ -753,7 +648,7 @@ import SeoHead from "../../seo/SeoHead";
 export default function Home() {
   return (
     <div>
-      <SeoHead title="Tools — TryAtLabs" path="/" description="Browse all tools." />
+      <SeoHead title="Tools — <%= brand %>" path="/" description="Browse all tools." />
       <h1>Tools</h1>
       <p>URL format: /:category/:slug</p>
       <p>Example: /pdf/pdf-to-jpg</p>
@@ -770,7 +665,7 @@ export default function Category() {
   const { category } = useParams();
   return (
     <div>
-      <SeoHead title={`${category} Tools — TryAtLabs`} path={`/${category}`} />
+      <SeoHead title={`${category} Tools — <%= brand %>`} path={`/${category}`} />
       <h2>Category: {category}</h2>
       <p>Example tool link:</p>
       <Link to={`/${category}/sample-tool`}>Open sample tool</Link>
@@ -779,18 +674,25 @@ export default function Category() {
 }
 """
 
-TOOLS_TOOL = """import React from "react";
+TOOLS_TOOL = """import React, { Suspense } from "react";
 import { useParams } from "react-router-dom";
 import SeoHead from "../../seo/SeoHead";
+import NotFound from "../NotFound";
+import { TOOLS_BY_SLUG } from "../../tools/registry.jsx";
 
 export default function Tool() {
   const { category, slug } = useParams();
+  const tool = TOOLS_BY_SLUG[slug];
+  if (!tool || tool.category !== category) return <NotFound />;
+  const { Component } = tool;
   return (
     <div>
-      <SeoHead title={`${slug} — TryAtLabs Tools`} path={`/${category}/${slug}`} />
-      <h2>{slug}</h2>
+      <SeoHead title={`${tool.title} — <%= brand %> Tools`} path={tool.path} description={tool.description} />
+      <h2>{tool.title}</h2>
       <p>Category: {category}</p>
-      <p>This is the dynamic tool page. Later you’ll load the tool component here.</p>
+      <Suspense fallback={<p>Loading…</p>}>
+        <Component />
+      </Suspense>
     </div>
   );
 }
@@ -811,18 +713,18 @@ export default function NotFound() {
 }
 """
 
-TOOLS_STATIC = lambda title, path: f"""import React from "react";
+TOOLS_STATIC = """import React from "react";
 import SeoHead from "../../seo/SeoHead";
 
-export default function Page() {{
+export default function Page() {
   return (
     <div>
-      <SeoHead title="{title}" path="{path}" />
-      <h2>{title}</h2>
+      <SeoHead title="<%= title %>" path="<%= path %>" />
+      <h2><%= title %></h2>
       <p>Placeholder page.</p>
     </div>
   );
-}}
+}
 """
 
 # Minimal CSS (keep simple)
@@ -854,13 +756,13 @@ ReactDOM.createRoot(document.getElementById("root")).render(
 );
 """
 
-SITE_CONFIG_TEMPLATE = lambda host: f"""export const SITE = {{
-  name: "TryAtLabs",
+SITE_CONFIG_TEMPLATE = """export const SITE = {
+  name: "<%= brand %>",
   canonicalBase:
     typeof window !== "undefined"
-      ? `${{window.location.protocol}}//${{window.location.host}}`
-      : "https://{host}",
-}};
+      ? `${window.location.protocol}//${window.location.host}`
+      : "https://<%= host %>",
+};
 """
 
 SEO_HEAD_TEMPLATE = """import React from "react";
@@ -884,13 +786,12 @@ export default function SeoHead({ title, description, path = "/" }) {
 
 ROUTER_SLUG_TEMPLATE = """import React from "react";
 import { createBrowserRouter } from "react-router-dom";
-import Home from "../pages/Home";
-import ToolPage from "../pages/ToolPage";
-import NotFound from "../pages/NotFound";
+import { Home, ToolPage, NotFound } from "./pages";
+import { TOOLS } from "../tools/registry.jsx";
 
 export const router = createBrowserRouter([
   { path: "/", element: <Home /> },
-  { path: "/:slug", element: <ToolPage /> },
+  ...TOOLS.map((tool) => ({ path: tool.path, element: <ToolPage slug={tool.slug} /> })),
   { path: "*", element: <NotFound /> },
 ]);
 """
@@ -898,164 +799,3350 @@ export const router = createBrowserRouter([
 HOME_TEMPLATE = """import React from "react";
 export default function Home(){ return <div style={{padding:24}}><h1>Home</h1><p>Placeholder.</p></div>; }
 """
-TOOLPAGE_TEMPLATE = """import React from "react";
-import { useParams } from "react-router-dom";
-export default function ToolPage(){ const {slug}=useParams(); return <div style={{padding:24}}><h2>{slug}</h2><p>Placeholder tool page.</p></div>; }
+TOOLPAGE_TEMPLATE = """import React, { Suspense } from "react";
+import { TOOLS_BY_SLUG } from "../tools/registry.jsx";
+export default function ToolPage({ slug }){ const { title, Component } = TOOLS_BY_SLUG[slug]; return <div style={{padding:24}}><h2>{title}</h2><Suspense fallback={<p>Loading…</p>}><Component /></Suspense></div>; }
 """
 NOTFOUND_TEMPLATE = """import React from "react";
 export default function NotFound(){ return <div style={{padding:24}}><h2>404</h2><p>Not found.</p></div>; }
 """
 
-# Map file path -> content
-CONTENT = {
-    # root
-    "README.md": "# tryatlabs\n\nMonorepo skeleton generated by bootstrap script.\n",
-    "pnpm-workspace.yaml": "packages:\n  - 'apps/*'\n  - 'packages/*'\n",
-    "yarn-workspaces": "apps/*\npackages/*\n",
-    ".gitignore": "node_modules/\ndist/\n.env.local\n",
-    ".env.example": "VITE_TOOLS_URL=\nVITE_PDF_URL=\nVITE_IMAGE_URL=\nVITE_TEXT_URL=\nVITE_DEV_URL=\n",
-
-    # main
-    "apps/main/index.html": MAIN_INDEX_HTML,
-    "apps/main/vite.config.js": VITE_CONFIG,
-    "apps/main/package.json": MAIN_PKG,
-    "apps/main/.env": MAIN_ENV,
-    "apps/main/src/app/constants/urls.js": MAIN_URLS,
-    "apps/main/src/app/constants/env.js": MAIN_ENV_JS,
-    "apps/main/src/app/constants/brand.js": MAIN_BRAND,
-    "apps/main/src/app/constants/seoDefaults.js": MAIN_SEO_DEFAULTS,
-    "apps/main/src/app/providers/HelmetProvider.jsx": MAIN_HELMET_PROVIDER,
-    "apps/main/src/app/providers/AnalyticsProvider.jsx": MAIN_ANALYTICS_PROVIDER,
-    "apps/main/src/app/providers/AdsProvider.jsx": MAIN_ADS_PROVIDER,
-    "apps/main/src/lib/analytics/subdomainRedirect.js": MAIN_SUBDOMAIN_REDIRECT,
-    "apps/main/src/seo/SeoHead.jsx": MAIN_SEO_HEAD,
-    "apps/main/src/routes/router.jsx": MAIN_ROUTER,
-    "apps/main/src/app/App.jsx": MAIN_APP,
-    "apps/main/src/app/main.jsx": MAIN_MAIN,
-    "apps/main/src/components/layout/SiteLayout.jsx": MAIN_LAYOUT,
-    "apps/main/src/components/layout/Header.jsx": MAIN_HEADER,
-    "apps/main/src/components/layout/Footer.jsx": MAIN_FOOTER,
-    "apps/main/src/pages/Home.jsx": MAIN_HOME,
-    "apps/main/src/pages/Ecosystem.jsx": PLACEHOLDER_PAGE("Ecosystem — TryAtLabs", "/ecosystem"),
-    "apps/main/src/pages/Labs.jsx": PLACEHOLDER_PAGE("Labs — TryAtLabs", "/labs"),
-    "apps/main/src/pages/Studio.jsx": PLACEHOLDER_PAGE("Studio — TryAtLabs", "/studio"),
-    "apps/main/src/pages/Partnerships.jsx": PLACEHOLDER_PAGE("Partnerships — TryAtLabs", "/partnerships"),
-    "apps/main/src/pages/Talent.jsx": PLACEHOLDER_PAGE("Talent — TryAtLabs", "/talent"),
-    "apps/main/src/pages/Contact.jsx": PLACEHOLDER_PAGE("Contact — TryAtLabs", "/contact"),
-    "apps/main/src/pages/Privacy.jsx": PLACEHOLDER_PAGE("Privacy — TryAtLabs", "/privacy"),
-    "apps/main/src/pages/Terms.jsx": PLACEHOLDER_PAGE("Terms — TryAtLabs", "/terms"),
-    "apps/main/src/pages/NotFound.jsx": MAIN_NOTFOUND,
-    "apps/main/src/styles/globals.css": CSS_GLOBAL,
-    "apps/main/src/styles/main-theme.css": "/* theme placeholder */\n",
-
-    # tools
-    "apps/tools/index.html": MAIN_INDEX_HTML,
-    "apps/tools/vite.config.js": VITE_CONFIG,
-    "apps/tools/package.json": TOOLS_PKG,
-    "apps/tools/src/app/site.config.js": TOOLS_SITE_CONFIG,
-    "apps/tools/src/seo/SeoHead.jsx": TOOLS_SEO_HEAD,
-    "apps/tools/src/components/layout/ToolLayout.jsx": TOOLS_LAYOUT,
-    "apps/tools/src/routes/router.jsx": TOOLS_ROUTER,
-    "apps/tools/src/app/App.jsx": TOOLS_APP,
-    "apps/tools/src/app/main.jsx": TOOLS_MAIN,
-    "apps/tools/src/pages/Home/Home.jsx": TOOLS_HOME,
-    "apps/tools/src/pages/Category/Category.jsx": TOOLS_CATEGORY,
-    "apps/tools/src/pages/Tool/Tool.jsx": TOOLS_TOOL,
-    "apps/tools/src/pages/NotFound.jsx": TOOLS_NOTFOUND,
-    "apps/tools/src/pages/Static/About.jsx": TOOLS_STATIC("About — Tools", "/about"),
-    "apps/tools/src/pages/Static/Privacy.jsx": TOOLS_STATIC("Privacy — Tools", "/privacy"),
-    "apps/tools/src/pages/Static/Terms.jsx": TOOLS_STATIC("Terms — Tools", "/terms"),
-    "apps/tools/src/pages/Static/Contact.jsx": TOOLS_STATIC("Contact — Tools", "/contact"),
-    "apps/tools/src/styles/globals.css": CSS_GLOBAL,
-    "apps/tools/src/styles/tools-theme.css": "/* tools theme placeholder */\n",
-
-    # pdf minimal runnable skeleton
-    "apps/pdf/index.html": MAIN_INDEX_HTML,
-    "apps/pdf/vite.config.js": VITE_CONFIG,
-    "apps/pdf/package.json": PDF_PKG,
-    "apps/pdf/src/app/App.jsx": APP_TEMPLATE,
-    "apps/pdf/src/app/main.jsx": MAIN_TEMPLATE,
-    "apps/pdf/src/app/site.config.js": SITE_CONFIG_TEMPLATE("pdf.tryatlabs.com"),
-    "apps/pdf/src/routes/router.jsx": ROUTER_SLUG_TEMPLATE,
-    "apps/pdf/src/pages/Home.jsx": HOME_TEMPLATE,
-    "apps/pdf/src/pages/ToolPage.jsx": TOOLPAGE_TEMPLATE,
-    "apps/pdf/src/pages/NotFound.jsx": NOTFOUND_TEMPLATE,
-    "apps/pdf/src/seo/SeoHead.jsx": SEO_HEAD_TEMPLATE,
-
-    # image minimal
-    "apps/image/index.html": MAIN_INDEX_HTML,
-    "apps/image/vite.config.js": VITE_CONFIG,
-    "apps/image/package.json": IMAGE_PKG,
-    "apps/image/src/app/App.jsx": APP_TEMPLATE,
-    "apps/image/src/app/main.jsx": MAIN_TEMPLATE,
-    "apps/image/src/app/site.config.js": SITE_CONFIG_TEMPLATE("image.tryatlabs.com"),
-    "apps/image/src/routes/router.jsx": ROUTER_SLUG_TEMPLATE,
-    "apps/image/src/pages/Home.jsx": HOME_TEMPLATE,
-    "apps/image/src/pages/ToolPage.jsx": TOOLPAGE_TEMPLATE,
-    "apps/image/src/pages/NotFound.jsx": NOTFOUND_TEMPLATE,
-
-    # text minimal
-    "apps/text/index.html": MAIN_INDEX_HTML,
-    "apps/text/vite.config.js": VITE_CONFIG,
-    "apps/text/package.json": TEXT_PKG,
-    "apps/text/src/app/App.jsx": APP_TEMPLATE,
-    "apps/text/src/app/main.jsx": MAIN_TEMPLATE,
-    "apps/text/src/app/site.config.js": SITE_CONFIG_TEMPLATE("text.tryatlabs.com"),
-    "apps/text/src/routes/router.jsx": ROUTER_SLUG_TEMPLATE,
-    "apps/text/src/pages/Home.jsx": HOME_TEMPLATE,
-    "apps/text/src/pages/ToolPage.jsx": TOOLPAGE_TEMPLATE,
-    "apps/text/src/pages/NotFound.jsx": NOTFOUND_TEMPLATE,
-
-    # dev minimal
-    "apps/dev/index.html": MAIN_INDEX_HTML,
-    "apps/dev/vite.config.js": VITE_CONFIG,
-    "apps/dev/package.json": DEV_PKG,
-    "apps/dev/src/app/App.jsx": APP_TEMPLATE,
-    "apps/dev/src/app/main.jsx": MAIN_TEMPLATE,
-    "apps/dev/src/app/site.config.js": SITE_CONFIG_TEMPLATE("dev.tryatlabs.com"),
-    "apps/dev/src/routes/router.jsx": ROUTER_SLUG_TEMPLATE,
-    "apps/dev/src/pages/Home.jsx": HOME_TEMPLATE,
-    "apps/dev/src/pages/ToolPage.jsx": TOOLPAGE_TEMPLATE,
-    "apps/dev/src/pages/NotFound.jsx": NOTFOUND_TEMPLATE,
+TEMPLATES = {
+    "MAIN_INDEX_HTML": MAIN_INDEX_HTML,
+    "VITE_CONFIG": VITE_CONFIG,
+    "VITE_CONFIG_REDIRECTS": VITE_CONFIG_REDIRECTS,
+    "VITE_CHUNKS": VITE_CHUNKS,
+    "MAIN_PKG": MAIN_PKG,
+    "MAIN_ENV": MAIN_ENV,
+    "MAIN_URLS": MAIN_URLS,
+    "MAIN_ENV_JS": MAIN_ENV_JS,
+    "MAIN_BRAND": MAIN_BRAND,
+    "MAIN_SEO_DEFAULTS": MAIN_SEO_DEFAULTS,
+    "MAIN_HELMET_PROVIDER": MAIN_HELMET_PROVIDER,
+    "MAIN_ANALYTICS_PROVIDER": MAIN_ANALYTICS_PROVIDER,
+    "MAIN_ADS_PROVIDER": MAIN_ADS_PROVIDER,
+    "MAIN_SUBDOMAIN_REDIRECT": MAIN_SUBDOMAIN_REDIRECT,
+    "MAIN_SEO_HEAD": MAIN_SEO_HEAD,
+    "MAIN_ROUTER": MAIN_ROUTER,
+    "MAIN_APP": MAIN_APP,
+    "MAIN_MAIN": MAIN_MAIN,
+    "MAIN_LAYOUT": MAIN_LAYOUT,
+    "MAIN_HEADER": MAIN_HEADER,
+    "MAIN_FOOTER": MAIN_FOOTER,
+    "MAIN_HOME": MAIN_HOME,
+    "PLACEHOLDER_PAGE": PLACEHOLDER_PAGE,
+    "MAIN_NOTFOUND": MAIN_NOTFOUND,
+    "TOOLS_SITE_CONFIG": TOOLS_SITE_CONFIG,
+    "TOOLS_SEO_HEAD": TOOLS_SEO_HEAD,
+    "TOOLS_LAYOUT": TOOLS_LAYOUT,
+    "TOOLS_ROUTER": TOOLS_ROUTER,
+    "TOOLS_APP": TOOLS_APP,
+    "TOOLS_MAIN": TOOLS_MAIN,
+    "TOOLS_HOME": TOOLS_HOME,
+    "TOOLS_CATEGORY": TOOLS_CATEGORY,
+    "TOOLS_TOOL": TOOLS_TOOL,
+    "TOOLS_NOTFOUND": TOOLS_NOTFOUND,
+    "TOOLS_STATIC": TOOLS_STATIC,
+    "CSS_GLOBAL": CSS_GLOBAL,
+    "APP_TEMPLATE": APP_TEMPLATE,
+    "MAIN_TEMPLATE": MAIN_TEMPLATE,
+    "SITE_CONFIG_TEMPLATE": SITE_CONFIG_TEMPLATE,
+    "SEO_HEAD_TEMPLATE": SEO_HEAD_TEMPLATE,
+    "ROUTER_SLUG_TEMPLATE": ROUTER_SLUG_TEMPLATE,
+    "HOME_TEMPLATE": HOME_TEMPLATE,
+    "TOOLPAGE_TEMPLATE": TOOLPAGE_TEMPLATE,
+    "NOTFOUND_TEMPLATE": NOTFOUND_TEMPLATE,
+}
+
+# --------------------------
+# template engine
+# --------------------------
+# Templates use <%= name %> tags, which can't clash with JSX braces or JS
+# template literals. Each template is compiled once into a str.format string.
+TEMPLATE_TAG = re.compile(r"<%=\s*([A-Za-z_][A-Za-z0-9_]*)\s*%>")
+
+_compiled_templates = {}
+# name -> [renders, seconds]; filled by render_template, printed by --template-stats
+TEMPLATE_STATS = {}
+_template_stats_lock = threading.Lock()
+
+def template_vars(source: str) -> set:
+    return set(TEMPLATE_TAG.findall(source))
+
+def compile_template(source: str) -> str:
+    fmt = _compiled_templates.get(source)
+    if fmt is None:
+        pieces = TEMPLATE_TAG.split(source)
+        # literals at even indexes (braces escaped for format), names at odd ones
+        fmt = "".join(
+            piece.replace("{", "{{").replace("}", "}}") if i % 2 == 0 else f"{{{piece}}}"
+            for i, piece in enumerate(pieces)
+        )
+        _compiled_templates[source] = fmt
+    return fmt
+
+def render_template(name: str, variables: dict) -> str:
+    start = time.perf_counter()
+    text = compile_template(TEMPLATES[name]).format_map(variables)
+    elapsed = time.perf_counter() - start
+    with _template_stats_lock:
+        stats = TEMPLATE_STATS.setdefault(name, [0, 0.0])
+        stats[0] += 1
+        stats[1] += elapsed
+    return text
+
+@functools.lru_cache(maxsize=SHARED_RENDER_CACHE)
+def render_shared(name: str, variables: tuple) -> str:
+    # Used by --tenants: one render per (template, vars) per worker process
+    return render_template(name, dict(variables))
+
+def print_template_stats() -> None:
+    print("🧩 Template renders:")
+    for name, (count, seconds) in sorted(TEMPLATE_STATS.items(), key=lambda item: -item[1][1]):
+        print(f"  {name:<24} {count:>6} renders  {seconds * 1e3:8.2f} ms  {seconds / count * 1e6:8.1f} µs/render")
+
+# --------------------------
+# spec (tryatlabs.spec.json -> layout)
+# --------------------------
+def static(text: str):
+    return lambda: text
+
+def check_rel_path(rel: str, where: str, problems: list) -> None:
+    if not isinstance(rel, str) or not rel or rel.startswith("/") or "\\" in rel or ".." in rel.split("/"):
+        problems.append(f"{where}: bad relative path {rel!r}")
+
+def compile_file_entry(entry, variables: dict, where: str, problems: list):
+    # Spec entry -> ("text", text, ()) or ("template", name, sorted vars)
+    if not isinstance(entry, dict) or len({"text", "template"} & set(entry)) != 1:
+        problems.append(f"{where}: needs exactly one of 'text' or 'template'")
+        return None
+    unknown = set(entry) - {"text", "template", "vars"}
+    if unknown:
+        problems.append(f"{where}: unknown keys {sorted(unknown)}")
+    if "text" in entry:
+        return ("text", entry["text"], ())
+
+    name = entry["template"]
+    if name not in TEMPLATES:
+        problems.append(f"{where}: unknown template {name!r}")
+        return None
+    merged = {**variables, **entry.get("vars", {})}
+    missing = template_vars(TEMPLATES[name]) - set(merged)
+    if missing:
+        problems.append(f"{where}: {name} needs vars {sorted(missing)}")
+    if not all(isinstance(v, str) for v in merged.values()):
+        problems.append(f"{where}: vars must be strings")
+    # Only the vars the template uses, so equal renders compare equal across apps and tenants
+    used = template_vars(TEMPLATES[name])
+    return ("template", name, tuple(sorted((k, v) for k, v in merged.items() if k in used)))
+
+def compile_scope(scope: dict, prefix: str, variables: dict, compiled: dict, problems: list, seen: set) -> None:
+    for d in scope.get("dirs", []):
+        check_rel_path(d, f"{prefix or '/'} dirs", problems)
+        compiled["dirs"].append(f"{prefix}{d}")
+    for tool in scope.get("tools", []):
+        slug = tool.get("slug") if isinstance(tool, dict) else tool
+        check_rel_path(slug, f"{prefix} tools", problems)
+        compiled["dirs"].append(f"{prefix}src/tools/{slug}")
+    for rel, entry in scope.get("files", {}).items():
+        check_rel_path(rel, f"{prefix or '/'} files", problems)
+        full = f"{prefix}{rel}"
+        if full in seen:
+            problems.append(f"{full}: defined twice")
+        seen.add(full)
+        compiled["files"].append(full)
+        if entry is not None:
+            compiled["content"][full] = compile_file_entry(entry, variables, full, problems)
+
+def app_variables(name: str, app: dict, site: dict) -> dict:
+    return {**site, "name": name, "package": app.get("package", ""), "host": app.get("host", "")}
+
+def hub_variables(spec: dict) -> dict:
+    # Vars for the hub templates (MAIN_URLS, MAIN_ENV, MAIN_ENV_JS, MAIN_HOME,
+    # MAIN_ROUTER, MAIN_SUBDOMAIN_REDIRECT): one line per app off the bare
+    # domain, in spec order, so a tenant with fewer apps links to no missing ones
+    domain = spec.get("site", {}).get("domain")
+    hubs = [
+        (name, name.upper(), app.get("host", ""), TITLE_WORDS.get(name, name.capitalize()))
+        for name, app in spec.get("apps", {}).items()
+        if isinstance(app, dict) and app.get("host") != domain
+    ]
+    routes = "".join(f'      {{ path: "/{name}", element: <SubdomainRedirect target="{key}" /> }},\n' for name, key, _, _ in hubs)
+    return {
+        "hub_urls": "".join(f'  {key}: "https://{host}",\n' for _, key, host, _ in hubs),
+        "hub_env": "".join(f"VITE_{key}_URL=http://localhost:{DEV_BASE_PORT + i}\n" for i, (_, key, _, _) in enumerate(hubs, 1)),
+        "hub_env_js": "".join(f"  {key}_URL: import.meta.env.VITE_{key}_URL,\n" for _, key, _, _ in hubs),
+        "hub_bases": "".join(f"  {key}: pick(URLS.{key}, ENV.{key}_URL),\n" for _, key, _, _ in hubs),
+        "hub_buttons": "".join(f'        <button onClick={{() => goTo("{key}", "/")}}>{label}</button>\n' for _, key, _, label in hubs),
+        "hub_routes": f"\n{routes}" if routes else "",
+    }
+
+def site_urls(spec: dict, site: dict) -> dict:
+    # KEY -> origin from the first app that renders URLS constants (MAIN_URLS);
+    # a broken entry is reported when that app's files are compiled
+    for name, app in spec.get("apps", {}).items():
+        files = app.get("files", {})
+        if isinstance(files, dict) and files.get(URLS_MODULE):
+            entry = compile_file_entry(files[URLS_MODULE], app_variables(name, app, site), "", [])
+            try:
+                return dict(URLS_ENTRY.findall(entry_renderer(entry)())) if entry else {}
+            except KeyError:  # vars missing
+                return {}
+    return {}
+
+def resource_hints(app: dict, urls: dict) -> str:
+    # <head> tags for index.html: the sibling origins this app's redirects hop
+    # to are preconnected and their home pages prefetched by speculation rules
+    # once a link to them is hovered; every other sibling origin only gets a
+    # dns-prefetch. urls only holds origins of apps present in the spec.
+    own = f"https://{app.get('host', '')}"
+    targets = app.get("redirects", {}) if isinstance(app.get("redirects"), dict) else {}
+    hops = [urls[t] for t in dict.fromkeys(targets.values()) if t in urls and urls[t] != own]
+    lines = [f'<link rel="preconnect" href="{url}" />' for url in hops]
+    lines += [
+        f'<link rel="dns-prefetch" href="{url}" />'
+        for url in dict.fromkeys(urls.values()) if url != own and url not in hops
+    ]
+    if hops:
+        rules = {"prefetch": [{"source": "list", "urls": [f"{url}/" for url in hops], "eagerness": "moderate"}]}
+        lines += ['<script type="speculationrules">', *json.dumps(rules, indent=2).splitlines(), "</script>"]
+    return "".join(f"\n    {line}" for line in lines)
+
+def compile_spec(spec: dict) -> tuple:
+    # Validates while compiling; returns (compiled layout, problems)
+    compiled = {"dirs": [], "files": [], "content": {}, "routes": {}}
+    problems = []
+    if spec.get("version") != SPEC_FORMAT:
+        problems.append(f"unsupported spec version {spec.get('version')!r} (expected {SPEC_FORMAT})")
+        return compiled, problems
+
+    # site vars (domain, brand, tagline) reach every template; tenants override them
+    site = spec.get("site", {})
+    for key in SITE_VARS:
+        if not isinstance(site.get(key), str):
+            problems.append(f"site: missing '{key}'")
+    site = {**site, **hub_variables(spec)}
+    seen = set()
+    catalog = []
+    # tenants may enable only some apps; hints and redirects skip the others
+    origins = {f"https://{app.get('host', '')}" for app in spec.get("apps", {}).values()}
+    urls = {key: url for key, url in site_urls(spec, site).items() if url in origins}
+    compile_scope(spec, "", site, compiled, problems, seen)
+    for name, pkg in spec.get("packages", {}).items():
+        check_rel_path(name, "packages", problems)
+        compile_scope(pkg, f"packages/{name}/", {**site, "name": name}, compiled, problems, seen)
+    for name, app in spec.get("apps", {}).items():
+        check_rel_path(name, "apps", problems)
+        for key in ("package", "host"):
+            if not isinstance(app.get(key), str):
+                problems.append(f"apps/{name}: missing '{key}'")
+        variables = {**app_variables(name, app, site), "hints": resource_hints(app, urls)}
+        compile_scope(app, f"apps/{name}/", variables, compiled, problems, seen)
+        compile_routes(name, app, variables, problems, compiled, seen)
+        catalog.extend(compile_registry(name, app, compiled, problems, seen))
+        compile_redirects(name, app, compiled, problems, seen, origins)
+        compile_pages(name, app, compiled, problems, seen)
+    if catalog and REGISTRY_HOME in compiled["dirs"]:
+        add_registry_output(f"{REGISTRY_HOME}/catalog.js", ("registry", "catalog", (tuple(catalog),)), compiled, problems, seen)
+    return compiled, problems
+
+def entry_renderer(entry: tuple):
+    kind, payload, variables = entry
+    if kind == "text":
+        return static(payload)
+    if kind == "registry":
+        return partial(REGISTRY_BUILDERS[payload], *variables)
+    return partial(render_template, payload, dict(variables))
+
+def load_compiled_spec(spec_path: Path, use_cache: bool = True) -> dict:
+    # The compiled (validated) spec is pickled under SPEC_CACHE_DIR, keyed by the
+    # spec bytes, the compiler (this file) and the templates it was validated against
+    raw = spec_path.read_bytes()
+    key = hashlib.sha256(raw)
+    key.update(f"\0{SPEC_FORMAT}\0".encode())
+    key.update(Path(__file__).read_bytes())
+    for name in sorted(TEMPLATES):
+        key.update(f"\0{name}\0{TEMPLATES[name]}".encode())
+    key = key.hexdigest()
+    cache = SPEC_CACHE_DIR / f"spec-{key[:24]}.pickle"
+    if use_cache:
+        try:
+            return pickle.loads(cache.read_bytes())
+        except (OSError, pickle.UnpicklingError, EOFError):
+            pass
+
+    try:
+        spec = json.loads(raw)
+    except ValueError as exc:
+        raise SystemExit(f"❌ {spec_path}: invalid JSON ({exc})")
+    compiled, problems = compile_spec(spec)
+    if problems:
+        raise SystemExit("\n".join([f"❌ {spec_path}:", *(f"  - {p}" for p in problems)]))
+
+    if use_cache:
+        SPEC_CACHE_DIR.mkdir(exist_ok=True)
+        for old in SPEC_CACHE_DIR.glob("spec-*.pickle"):
+            old.unlink(missing_ok=True)
+        tmp = cache.with_suffix(".tmp")
+        tmp.write_bytes(pickle.dumps(compiled, protocol=pickle.HIGHEST_PROTOCOL))
+        os.replace(tmp, cache)
+    return compiled
+
+# --------------------------
+# tool registry (spec "tools" -> tools/registry.jsx, tool chunks, sitemap, catalog)
+# --------------------------
+def tool_title(slug: str) -> str:
+    return " ".join(TITLE_WORDS.get(word, word.capitalize()) for word in slug.split("-"))
+
+def tool_component(slug: str) -> str:
+    name = "".join(word.capitalize() for word in slug.split("-"))
+    return name if name[:1].isalpha() else f"Tool{name}"
+
+def tool_module(slug: str) -> str:
+    # word-counter -> word-counter/WordCounter.jsx, as the apps lay tools out
+    return f"{slug}/{tool_component(slug)}.jsx"
+
+def compile_tool(tool, app: str, where: str, problems: list) -> tuple:
+    # "slug" or {"slug", "title", "category", "description"} -> (slug, title, category, description)
+    if isinstance(tool, str):
+        tool = {"slug": tool}
+    if not isinstance(tool, dict) or not isinstance(tool.get("slug"), str):
+        problems.append(f"{where}: tools need a slug")
+        return None
+    unknown = set(tool) - {"slug", "title", "category", "description"}
+    if unknown:
+        problems.append(f"{where}/{tool['slug']}: unknown keys {sorted(unknown)}")
+    slug = tool["slug"]
+    return (slug, tool.get("title", tool_title(slug)), tool.get("category", app), tool.get("description", ""))
+
+def add_registry_output(full: str, entry: tuple, compiled: dict, problems: list, seen: set) -> None:
+    # Registry outputs fill placeholders from the spec but never replace real content
+    if full in compiled["content"]:
+        problems.append(f"{full}: generated by the tool registry, remove it from the spec")
+        return
+    if full not in seen:
+        seen.add(full)
+        compiled["files"].append(full)
+    compiled["content"][full] = entry
+
+def compile_registry(name: str, app: dict, compiled: dict, problems: list, seen: set) -> list:
+    # Entries are ("registry", builder, inputs): a registry output only changes,
+    # and is only re-rendered by watch/--incremental, when its own inputs change
+    where = f"apps/{name} tools"
+    tools = tuple(t for t in (compile_tool(t, name, where, problems) for t in app.get("tools", [])) if t)
+    if not tools:
+        return []
+    duplicates = sorted(slug for slug, count in collections.Counter(t[0] for t in tools).items() if count > 1)
+    if duplicates:
+        problems.append(f"{where}: duplicate slugs {duplicates}")
+        return []
+    prefix = f"apps/{name}/"
+    route = app.get("tool_route", "/:slug")
+    if route not in TOOL_ROUTES:
+        problems.append(f"apps/{name}: tool_route must be one of {sorted(TOOL_ROUTES)}")
+        route = "/:slug"
+    paths = tuple(TOOL_ROUTES[route].format(slug=slug, category=category) for slug, _, category, _ in tools)
+    index = f"{prefix}{TOOLS_MODULE}"
+    add_registry_output(index, ("registry", "index", (tools, paths)), compiled, problems, seen)
+    # each tool's component file; a stub seeds it until the tool is implemented
+    components = [f"{prefix}src/tools/{tool_module(tool[0])}" for tool in tools]
+    for tool, component in zip(tools, components):
+        add_registry_output(component, ("registry", "tool", (tool,)), compiled, problems, seen)
+    # tool pages are interactive, so prerender takes their head from the registry;
+    # a tool's own component is its only source, so adding a tool moves no other lastmod
+    brand = compiled["routes"][name]["brand"]
+    compiled["routes"][name]["routes"].extend(
+        (path, (component,), (f"{tool[1]} — {brand}", tool[3]))
+        for tool, path, component in zip(tools, paths, components)
+    )
+    host = app.get("host", "")
+    return [(name, f"https://{host}{path}", *tool) for tool, path in zip(tools, paths)]
+
+def compile_budgets(name: str, app: dict, problems: list) -> dict:
+    # gzip kB a route may load: "initial_kb" for "/", "route_kb" for every route
+    budgets = app.get("budgets", {})
+    if not isinstance(budgets, dict) or set(budgets) - set(BUDGET_KEYS) or not all(
+        isinstance(v, (int, float)) and v > 0 for v in budgets.values()
+    ):
+        problems.append(f"apps/{name}: budgets takes positive {' / '.join(BUDGET_KEYS)} numbers")
+        return {}
+    return budgets
+
+def compile_routes(name: str, app: dict, variables: dict, problems: list, compiled: dict, seen: set) -> None:
+    # Sitemap/prerender routes: "/" (home page sources) and every page whose
+    # template takes a "path" var; compile_registry adds the tool routes. Each
+    # route is (path, sources, head): lastmod is derived from the sources, and
+    # head is (title, description) when the page's own SeoHead can't give it.
+    prefix = f"apps/{name}/"
+    home = tuple(rel for rel in compiled["content"] if rel.startswith(f"{prefix}src/pages/Home"))
+    pages = [
+        (dict(entry[2])["path"], (rel,), ())
+        for rel, entry in compiled["content"].items()
+        if rel.startswith(prefix) and entry and entry[0] == "template" and "path" in dict(entry[2])
+    ]
+    notfound = f"{prefix}src/pages/NotFound.jsx"
+    compiled["routes"][name] = {
+        "host": app.get("host", ""),
+        "brand": variables.get("brand", ""),
+        "head": (f"{variables.get('brand', '')} — {variables.get('tagline', '')}", variables.get("tagline", "")),
+        "notfound": notfound if notfound in compiled["content"] else None,
+        "budgets": compile_budgets(name, app, problems),
+        "routes": [("/", home, ()), *pages],
+    }
+    sitemap = f"{prefix}public/sitemap.xml"
+    if sitemap not in seen:
+        seen.add(sitemap)
+        compiled["files"].append(sitemap)
+
+def registry_header(key: str = "tools", comment: str = "//") -> str:
+    return f"{comment} Generated from {SPEC_PATH.name} by 1.py: edit the app's \"{key}\" there, not this file.\n"
+
+def build_tool_index(tools: tuple, paths: tuple) -> str:
+    # One lazy import per tool, so every tool is its own chunk
+    lines = [registry_header().rstrip(), 'import { lazy } from "react";', "", "export const TOOLS = ["]
+    for (slug, title, category, description), path in zip(tools, paths):
+        lines.append(
+            f"  {{ slug: {json.dumps(slug)}, title: {json.dumps(title, ensure_ascii=False)}, "
+            f"category: {json.dumps(category)}, path: {json.dumps(path)}, "
+            f"description: {json.dumps(description, ensure_ascii=False)}, "
+            f"Component: lazy(() => import({json.dumps(f'./{tool_module(slug)}')})) }},"
+        )
+    lines += ["];", "", "export const TOOLS_BY_SLUG = Object.fromEntries(TOOLS.map((tool) => [tool.slug, tool]));", ""]
+    return "\n".join(lines)
+
+def build_tool_stub(tool: tuple) -> str:
+    slug, title, _, _ = tool
+    return (
+        'import React from "react";\n'
+        f"export default function {tool_component(slug)}(){{ return <div><p>{title} is not implemented yet.</p></div>; }}\n"
+    )
+
+def build_catalog(entries: tuple) -> str:
+    # Every app's tools in one place, for cross-linking between subdomains
+    rows = "".join(
+        f"  {{ app: {json.dumps(app)}, slug: {json.dumps(slug)}, title: {json.dumps(title, ensure_ascii=False)}, "
+        f"category: {json.dumps(category)}, url: {json.dumps(url)} }},\n"
+        for app, url, slug, title, category, _ in entries
+    )
+    return f"{registry_header()}\nexport const TOOL_CATALOG = [\n{rows}];\n"
+
+# --------------------------
+# route pages (src/pages/* -> src/routes/pages.jsx, lazy unless the app is "eager")
+# --------------------------
+def compile_pages(name: str, app: dict, compiled: dict, problems: list, seen: set) -> None:
+    prefix = f"apps/{name}/"
+    if f"{prefix}src/routes/router.jsx" not in compiled["content"]:
+        return
+    eager = app.get("eager", False)
+    if not isinstance(eager, bool):
+        problems.append(f"apps/{name}: eager must be true or false")
+    pages = tuple(sorted(
+        (rel.rsplit("/", 1)[-1].removesuffix(".jsx"), f"../pages/{rel[len(prefix) + len('src/pages/'):-len('.jsx')]}")
+        for rel in compiled["files"]
+        if rel.startswith(f"{prefix}src/pages/") and rel.endswith(".jsx")
+    ))
+    duplicates = sorted(page for page, count in collections.Counter(p[0] for p in pages).items() if count > 1)
+    if duplicates:
+        problems.append(f"apps/{name}: pages {duplicates} share a component name")
+        return
+    add_registry_output(f"{prefix}{PAGES_MODULE}", ("registry", "pages", (pages, eager is True)), compiled, problems, seen)
+
+def build_pages(pages: tuple, eager: bool) -> str:
+    # Home stays in the entry chunk so "/" paints without a second request;
+    # every other page is its own chunk behind a Suspense boundary
+    lines = [registry_header("files").rstrip()]
+    if eager:
+        lines += [f'export {{ default as {page} }} from "{path}";' for page, path in pages]
+        return "\n".join(lines) + "\n"
+    lines += ['import React, { lazy, Suspense } from "react";']
+    lines += [f'import {page} from "{path}";' for page, path in pages if page == "Home"]
+    lines += [
+        "",
+        "function page(load) {",
+        "  const Page = lazy(load);",
+        "  return function LazyPage(props) {",
+        "    return (",
+        "      <Suspense fallback={<p>Loading…</p>}>",
+        "        <Page {...props} />",
+        "      </Suspense>",
+        "    );",
+        "  };",
+        "}",
+        "",
+    ]
+    lines += ["export { Home };"] if any(page == "Home" for page, _ in pages) else []
+    lines += [f'export const {page} = page(() => import("{path}"));' for page, path in pages if page != "Home"]
+    return "\n".join(lines) + "\n"
+
+# --------------------------
+# redirects (spec "redirects" -> _redirects, nginx include, Vite dev plugin)
+# --------------------------
+def redirect_pattern(source: str) -> str:
+    # "/category/:category" -> "^/category/([^/]+)/?$" (PCRE and JS alike)
+    parts = ("([^/]+)" if part.startswith(":") else re.escape(part) for part in source.strip("/").split("/"))
+    return f"^/{'/'.join(parts)}/?$".replace("^//?$", "^/?$")
+
+def redirect_groups(source: str, to: str) -> str:
+    # "/:category" -> "/$1", numbered by the param's position in the source
+    params = re.findall(r":(\w+)", source)
+    return re.sub(r":(\w+)", lambda m: f"${params.index(m.group(1)) + 1}", to)
+
+def compile_redirects(name: str, app: dict, compiled: dict, problems: list, seen: set, origins: set) -> None:
+    # {"/tools": "TOOLS", "/category/:category": "/:category"}: upper-case
+    # targets are keys of the app's URLS constants, anything else a local path;
+    # URLS targets whose origin isn't one of the spec's apps are left out
+    redirects = app.get("redirects", {})
+    if not redirects:
+        return
+    where = f"apps/{name} redirects"
+    if not isinstance(redirects, dict):
+        problems.append(f"{where}: must be an object of path -> target")
+        return
+    prefix = f"apps/{name}/"
+    urls_entry = compiled["content"].get(f"{prefix}{URLS_MODULE}")
+    urls = dict(URLS_ENTRY.findall(entry_renderer(urls_entry)())) if urls_entry else {}
+    rules = []
+    for source, target in redirects.items():
+        if not source.startswith("/") or not isinstance(target, str) or not target:
+            problems.append(f"{where}: {source!r} must map a path to a path or a URLS key")
+        elif target.isupper():
+            if target in urls:
+                if urls[target] in origins:
+                    rules.append((source, target, urls[target], "/"))
+            else:
+                problems.append(f"{where}: {source} -> {target} is not in {prefix}{URLS_MODULE}")
+        elif not target.startswith("/") or set(re.findall(r":(\w+)", target)) - set(re.findall(r":(\w+)", source)):
+            problems.append(f"{where}: {source} -> {target} must be a path using only the source's params")
+        else:
+            rules.append((source, "", "", target))
+    for rel, builder in REDIRECT_OUTPUTS.items():
+        add_registry_output(f"{prefix}{rel}", ("registry", builder, (tuple(rules),)), compiled, problems, seen)
+
+def build_redirects_file(rules: tuple) -> str:
+    # Netlify / Cloudflare Pages; copied into dist from public/
+    lines = [registry_header("redirects", "#").rstrip()]
+    lines += [f"{source}  {base}{to}  301" for source, _, base, to in rules]
+    return "\n".join(lines) + "\n"
+
+def build_nginx_redirects(rules: tuple) -> str:
+    lines = [registry_header("redirects", "#").rstrip(), "# include inside the app's server { } block"]
+    lines += [
+        f"location ~ {redirect_pattern(source)} {{ return 301 {base}{redirect_groups(source, to)}$is_args$args; }}"
+        for source, _, base, to in rules
+    ]
+    return "\n".join(lines) + "\n"
+
+def build_vite_redirects(rules: tuple) -> str:
+    # Same rules in `vite` and `vite preview`. URLS targets honour the VITE_*_URL
+    # overrides from .env like goTo() does, and answer 302 so browsers don't
+    # cache local ports.
+    rows = "".join(
+        f"  {{ pattern: {json.dumps(redirect_pattern(source))}, target: {json.dumps(target)}, "
+        f"to: {json.dumps(redirect_groups(source, to))} }},\n"
+        for source, target, _, to in rules
+    )
+    urls = "".join(f"  {target}: {json.dumps(base)},\n" for _, target, base, _ in rules if target)
+    return f"""{registry_header("redirects")}import {{ loadEnv }} from "vite";
+
+const RULES = [
+{rows}].map((rule) => ({{ ...rule, pattern: new RegExp(rule.pattern) }}));
+
+const URLS = {{
+{urls}}};
+
+export default function redirects() {{
+  let base = {{}};
+
+  function middleware(req, res, next) {{
+    const [pathname, query] = req.url.split("?", 2);
+    for (const rule of RULES) {{
+      const match = pathname.match(rule.pattern);
+      if (!match) continue;
+      const to = rule.to.replace(/\\$(\\d+)/g, (_, i) => match[i]);
+      res.statusCode = 302;
+      res.setHeader("Location", `${{rule.target ? base[rule.target] : ""}}${{to}}${{query ? `?${{query}}` : ""}}`);
+      res.end();
+      return;
+    }}
+    next();
+  }}
+
+  return {{
+    name: "redirects",
+    configResolved(config) {{
+      const env = loadEnv(config.mode, config.envDir || config.root, "VITE_");
+      base = Object.fromEntries(
+        Object.entries(URLS).map(([key, url]) => [key, (env[`VITE_${{key}}_URL`] || "").trim() || url])
+      );
+    }},
+    configureServer(server) {{
+      server.middlewares.use(middleware);
+    }},
+    configurePreviewServer(server) {{
+      server.middlewares.use(middleware);
+    }},
+  }};
+}}
+"""
+
+# builders of ("registry", builder, inputs) entries
+REGISTRY_BUILDERS = {
+    "index": build_tool_index,
+    "tool": build_tool_stub,
+    "catalog": build_catalog,
+    "redirects": build_redirects_file,
+    "nginx": build_nginx_redirects,
+    "vite-redirects": build_vite_redirects,
+    "pages": build_pages,
 }
 
+# Registry outputs that only seed a file: written while missing or still the
+# generator's own, never over a file someone has replaced (see seed_owned)
+SEED_BUILDERS = frozenset({"tool"})
+
 # --------------------------
 # helpers
 # --------------------------
-def safe_mkdir(path: Path) -> None:
-    path.mkdir(parents=True, exist_ok=True)
+def set_root(path: Path) -> None:
+    global ROOT, STAGING_DIR, CAS_DIR
+    ROOT = Path(path)
+    STAGING_DIR = ROOT.parent / f".{ROOT.name}.staging"
+    CAS_DIR = ROOT.parent / f".{ROOT.name}.cas"
+
+def safe_mkdir(path: Path) -> int:
+    # Returns how many directories were actually created (path and missing ancestors)
+    missing = []
+    while not path.is_dir():
+        missing.append(path)
+        path = path.parent
+    for p in reversed(missing):
+        p.mkdir(exist_ok=True)
+    note_dirs(len(missing))
+    return len(missing)
 
-def safe_touch(path: Path) -> None:
-    safe_mkdir(path.parent)
-    if not path.exists():
+def safe_touch(path: Path, make_parent: bool = True) -> bool:
+    start = time.perf_counter()
+    if make_parent:
+        safe_mkdir(path.parent)
+    created = not path.exists()
+    if created:
         path.write_text("", encoding="utf-8")
+    note_file(path.relative_to(ROOT).as_posix(), "written" if created else "skipped", 0.0, time.perf_counter() - start, 0)
+    return created
 
-def write_file(rel_path: str, content: str) -> None:
+def write_file(rel_path: str, content: str, make_parent: bool = True, link_mode: str = "copy", digest: str = "") -> None:
     p = ROOT / rel_path
-    safe_mkdir(p.parent)
-    p.write_text(content, encoding="utf-8")
+    if make_parent:
+        safe_mkdir(p.parent)
+    materialize(p, content, digest or content_hash(content), link_mode)
+
+# --------------------------
+# content-addressed store (--link-mode)
+# --------------------------
+def ensure_blob(content: str, digest: str) -> Path:
+    # Each unique blob is written once; concurrent writers race harmlessly via rename
+    blob = CAS_DIR / digest[:2] / digest
+    if blob.exists():
+        return blob
+    blob.parent.mkdir(parents=True, exist_ok=True)
+    tmp = blob.with_name(f"{digest}.{threading.get_ident()}.tmp")
+    tmp.write_text(content, encoding="utf-8")
+    os.replace(tmp, blob)
+    return blob
+
+def clone_file(src: Path, dst: Path) -> None:
+    # Reflink where the filesystem supports it, plain copy otherwise
+    if fcntl is not None:
+        with open(src, "rb") as s, open(dst, "wb") as d:
+            try:
+                fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+                return
+            except OSError:
+                pass
+    shutil.copyfile(src, dst)
+
+def materialize(dest: Path, content: str, digest: str, link_mode: str) -> None:
+    # copy writes the text; hardlink/reflink point dest at the shared blob.
+    # Hardlinked files share one inode: edit them only after regenerating with copy.
+    if link_mode == "copy":
+        # A dest left hardlinked by an earlier run shares the blob's inode, so
+        # writing in place would rewrite the blob and every file linked to it.
+        try:
+            if dest.stat().st_nlink > 1:
+                dest.unlink()
+        except FileNotFoundError:
+            pass
+        dest.write_text(content, encoding="utf-8")
+        return
+    blob = ensure_blob(content, digest)
+    tmp = dest.with_name(f".{dest.name}.{threading.get_ident()}.tmp")
+    tmp.unlink(missing_ok=True)
+    if link_mode == "hardlink":
+        os.link(blob, tmp)
+    else:
+        clone_file(blob, tmp)
+    os.replace(tmp, dest)
+
+# --------------------------
+# incremental manifest
+# --------------------------
+@functools.lru_cache(maxsize=4096)
+def content_hash(content: str) -> str:
+    # Shared renders return the same str object, so repeats cost a cache hit
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+def load_manifest() -> dict:
+    try:
+        data = json.loads((ROOT / MANIFEST_NAME).read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return {}
+    return data.get("files", {})
+
+def save_manifest(files: dict, base: Path = None) -> None:
+    # base is ROOT, or STAGING_DIR under --staged
+    base = base or ROOT
+    data = {"version": 1, "files": dict(sorted(files.items()))}
+    tmp = base / f"{MANIFEST_NAME}.tmp"
+    tmp.write_text(json.dumps(data, indent=1) + "\n", encoding="utf-8")
+    os.replace(tmp, base / MANIFEST_NAME)
+
+def unchanged_entry(rel_path: str, digest: str, manifest: dict):
+    # Manifest entry if the file on disk is still what we generated last time
+    # (same rendered hash, same size/mtime), else None. Costs one stat().
+    entry = manifest.get(rel_path)
+    if not entry or entry["sha256"] != digest:
+        return None
+    try:
+        st = (ROOT / rel_path).stat()
+    except FileNotFoundError:
+        return None
+    if st.st_size == entry["size"] and st.st_mtime_ns == entry["mtime_ns"]:
+        return entry
+    return None
+
+def seed_owned(rel_path: str, manifest: dict) -> bool:
+    # A seed file is ours while missing or untouched since we wrote it; one that
+    # was implemented, or was there before the generator, is left alone
+    try:
+        st = (ROOT / rel_path).stat()
+    except FileNotFoundError:
+        return True
+    entry = manifest.get(rel_path)
+    return bool(entry) and st.st_size == entry["size"] and st.st_mtime_ns == entry["mtime_ns"]
+
+def writable_content(layout: dict, manifest: dict) -> tuple:
+    # (content to write, seed files left alone); the latter count as skipped
+    kept = {rel for rel in layout.get("seeds", ()) if rel in layout["content"] and not seed_owned(rel, manifest)}
+    for rel in sorted(kept):
+        note_file(rel, "skipped", 0.0, 0.0, 0)
+    return {rel: render for rel, render in layout["content"].items() if rel not in kept}, kept
+
+def manifest_entry(rel_path: str, digest: str, base: Path = None) -> dict:
+    # a staged file keeps its size and mtime through the rename into ROOT
+    st = ((base or ROOT) / rel_path).stat()
+    return {"sha256": digest, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+def sync_file(rel_path: str, render, manifest: dict, incremental: bool, make_parent: bool = True, link_mode: str = "copy") -> tuple:
+    # Returns ("written" | "unchanged", manifest entry). An unchanged file is
+    # only stat()ed: same rendered hash as last run and same size/mtime on disk.
+    start = time.perf_counter()
+    content = render()
+    rendered = time.perf_counter()
+    digest = content_hash(content)
+    note_blob(digest)
+    entry = unchanged_entry(rel_path, digest, manifest) if incremental else None
+    if entry:
+        note_file(rel_path, "unchanged", rendered - start, time.perf_counter() - rendered, 0)
+        return "unchanged", entry
+
+    write_file(rel_path, content, make_parent, link_mode, digest)
+    entry = manifest_entry(rel_path, digest)
+    note_file(rel_path, "written", rendered - start, time.perf_counter() - rendered, entry["size"])
+    return "written", entry
+
+# --------------------------
+# selection (--only / --glob)
+# --------------------------
+def render_once(render):
+    # Memoized renderer shared by every path with the same spec entry
+    result = []
+    lock = threading.Lock()
+
+    def render_shared() -> str:
+        with lock:
+            if not result:
+                result.append(render())
+        return result[0]
+    return render_shared
+
+def layout_from_compiled(compiled: dict, shared_renders: bool = False) -> dict:
+    # Identical entries (same template + vars) render once; one-off entries
+    # stay unmemoized so their text is dropped right after it is written
+    uses = collections.Counter(compiled["content"].values())
+    renderers = {}
+    content = {}
+    for rel, entry in compiled["content"].items():
+        if entry not in renderers:
+            if shared_renders and entry[0] == "template":
+                renderers[entry] = partial(render_shared, entry[1], entry[2])
+            else:
+                render = entry_renderer(entry)
+                renderers[entry] = render_once(render) if uses[entry] > 1 else render
+        content[rel] = renderers[entry]
+    seeds = frozenset(
+        rel for rel, entry in compiled["content"].items() if entry and entry[0] == "registry" and entry[1] in SEED_BUILDERS
+    )
+    return {
+        "dirs": compiled["dirs"], "files": compiled["files"], "content": content, "routes": compiled["routes"], "seeds": seeds,
+    }
+
+def full_layout(spec_path: Path = SPEC_PATH, use_cache: bool = True) -> dict:
+    return layout_from_compiled(load_compiled_spec(spec_path, use_cache))
+
+def path_selected(rel_path: str, only: list, globs: list) -> bool:
+    if not only and not globs:
+        return True
+    for prefix in only:
+        prefix = prefix.strip("/")
+        if rel_path == prefix or rel_path.startswith(f"{prefix}/"):
+            return True
+    return any(fnmatch.fnmatchcase(rel_path, pattern) for pattern in globs)
+
+def select_layout(layout: dict, only: list, globs: list) -> dict:
+    # Filters paths only; renderers of unselected files are never called
+    return {
+        "dirs": [d for d in layout["dirs"] if path_selected(d, only, globs)],
+        "files": [f for f in layout["files"] if path_selected(f, only, globs)],
+        "content": {rel: r for rel, r in layout["content"].items() if path_selected(rel, only, globs)},
+        "routes": {
+            app: routes for app, routes in layout.get("routes", {}).items()
+            if path_selected(f"apps/{app}/public/sitemap.xml", only, globs)
+        },
+        "seeds": layout.get("seeds", frozenset()),
+    }
+
+def placeholder_files(layout: dict) -> list:
+    # Files that only need to exist; files with content are rendered and written
+    return [f for f in layout["files"] if f not in layout["content"]]
+
+# --------------------------
+# directory plan
+# --------------------------
+def build_path_trie(layout: dict) -> dict:
+    # Nested {name: children} for every directory implied by dirs, files and content
+    trie = {}
+    # spec paths are always "/"-separated (check_rel_path), so plain str ops
+    # are enough here and much cheaper than Path() on large trees
+    for rel in [*layout["dirs"], *(f.rpartition("/")[0] for f in [*layout["files"], *layout["content"]])]:
+        node = trie
+        for part in rel.split("/"):
+            if part and part != ".":
+                node = node.setdefault(part, {})
+    return trie
+
+def iter_trie(trie: dict, prefix: str = ""):
+    # Yields (path, children) for every directory, parents before children
+    for name in sorted(trie):
+        path = f"{prefix}{name}"
+        yield path, trie[name]
+        yield from iter_trie(trie[name], f"{path}/")
+
+def find_collisions(layout: dict) -> list:
+    # Duplicate entries, and paths that only differ by case (break on Windows/macOS)
+    problems = []
+    for label, entries in (("dirs", layout["dirs"]), ("files", layout["files"])):
+        seen = set()
+        for rel in entries:
+            if rel in seen:
+                problems.append(f"duplicate in {label}: {rel}")
+            seen.add(rel)
+    by_fold = {}
+    for rel in sorted({*layout["dirs"], *layout["files"], *layout["content"]}):
+        by_fold.setdefault(rel.casefold(), []).append(rel)
+    for group in by_fold.values():
+        if len(group) > 1:
+            problems.append(f"case collision: {', '.join(group)}")
+    return problems
+
+def find_file_dir_conflicts(layout: dict, trie: dict) -> list:
+    conflicts = []
+    for rel in sorted({*layout["files"], *layout["content"]}):
+        node = trie
+        for part in rel.split("/"):
+            if not part or part == ".":
+                continue
+            node = node.get(part)
+            if node is None:
+                break
+        else:
+            conflicts.append(rel)
+    return conflicts
+
+def plan_dirs(layout: dict) -> dict:
+    trie = build_path_trie(layout)
+    dirs = [path for path, _ in iter_trie(trie)]
+    leaves = [path for path, children in iter_trie(trie) if not children]
+    return {
+        "dirs": len(dirs),
+        "leaves": leaves,
+        # every directory plus ROOT is created once on a fresh tree, none on an existing one
+        "mkdir_calls_fresh": len(dirs) + 1,
+        "mkdir_calls_existing": 0,
+        # build_skeleton calls safe_mkdir for ROOT and each leaf; the serial path
+        # calls it once per dirs entry, placeholder and content file
+        "safe_mkdir_calls": len(leaves) + 1,
+        "safe_mkdir_calls_naive": len(layout["dirs"]) + len(placeholder_files(layout)) + len(layout["content"]),
+        # one is_dir() per safe_mkdir call on an existing tree; plus stat + mkdir per directory on a fresh one
+        "syscalls_existing": len(leaves) + 1,
+        "syscalls_fresh": len(leaves) + 1 + 2 * (len(dirs) + 1),
+        "collisions": find_collisions(layout),
+        "conflicts": find_file_dir_conflicts(layout, trie),
+    }
+
+def print_dir_plan(plan: dict) -> None:
+    print(f"📁 Directories: {plan['dirs']} ({len(plan['leaves'])} leaves)")
+    print(f"🔢 mkdir calls: {plan['mkdir_calls_fresh']} fresh / {plan['mkdir_calls_existing']} existing tree, "
+          f"safe_mkdir calls: {plan['safe_mkdir_calls']} (serial path: {plan['safe_mkdir_calls_naive']})")
+    print(f"🔢 syscalls: ~{plan['syscalls_fresh']} fresh / ~{plan['syscalls_existing']} existing tree")
+    for problem in plan["collisions"]:
+        print(f"⚠️  {problem}")
+    for rel in plan["conflicts"]:
+        print(f"❌ both file and directory: {rel}")
+
+def build_skeleton(plan: dict) -> None:
+    # Only leaves are created; their missing ancestors come along, each once
+    safe_mkdir(ROOT)
+    for leaf in plan["leaves"]:
+        safe_mkdir(ROOT / leaf)
+
+# --------------------------
+# write engine
+# --------------------------
+def write_serial(layout: dict, manifest: dict, incremental: bool, link_mode: str = "copy") -> tuple:
+    counts = {"written": 0, "skipped": 0, "unchanged": 0}
+    new_manifest = {}
 
-def main() -> None:
     # Create dirs
-    for d in DIRS:
+    for d in layout["dirs"]:
         safe_mkdir(ROOT / d)
 
-    # Create all files (empty first)
-    for f in FILES:
-        safe_touch(ROOT / f)
+    # Create placeholder files (files with content are written below)
+    for f in placeholder_files(layout):
+        counts["written" if safe_touch(ROOT / f) else "skipped"] += 1
 
     # Fill important files with content
-    for rel, text in CONTENT.items():
-        write_file(rel, text)
+    content, kept = writable_content(layout, manifest)
+    counts["skipped"] += len(kept)
+    for rel, render in content.items():
+        status, entry = sync_file(rel, render, manifest, incremental, link_mode=link_mode)
+        counts[status] += 1
+        new_manifest[rel] = entry
+    return counts, new_manifest
+
+def write_parallel(layout: dict, manifest: dict, incremental: bool, workers: int, plan: dict, link_mode: str = "copy") -> tuple:
+    counts = {"written": 0, "skipped": 0, "unchanged": 0}
+    new_manifest = {}
+
+    # Directory skeleton once, from the leaf plan; file writes then never mkdir
+    build_skeleton(plan)
+    content, kept = writable_content(layout, manifest)
+    counts["skipped"] += len(kept)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        touched = pool.map(lambda f: safe_touch(ROOT / f, make_parent=False), placeholder_files(layout))
+        synced = pool.map(
+            lambda item: sync_file(item[0], item[1], manifest, incremental, False, link_mode),
+            content.items(),
+        )
+        for created in touched:
+            counts["written" if created else "skipped"] += 1
+        for rel, (status, entry) in zip(content, synced):
+            counts[status] += 1
+            new_manifest[rel] = entry
+    return counts, new_manifest
+
+# --------------------------
+# staged, atomic generation (--staged)
+# --------------------------
+def fsync_path(path: Path) -> None:
+    # Directories can't be opened for fsync on Windows; skip them there
+    flags = os.O_RDONLY | getattr(os, "O_DIRECTORY", 0) if path.is_dir() else os.O_RDONLY
+    try:
+        fd = os.open(path, flags)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def fsync_batch(base: Path, rel_paths: list) -> None:
+    # One pass at the end instead of an fsync per write: files, then their dirs
+    for rel in rel_paths:
+        fsync_path(base / rel)
+    for d in sorted({(base / rel).parent for rel in rel_paths} | {base}):
+        fsync_path(d)
+
+def commit_staging(fsync_policy: str) -> list:
+    # Roll the staging tree forward into ROOT. Safe to re-run after a crash:
+    # already-moved files are simply gone from the stage.
+    journal = json.loads((STAGING_DIR / JOURNAL_NAME).read_text(encoding="utf-8"))
+    moved = []
+    for rel in journal["files"]:
+        src = STAGING_DIR / rel
+        if not src.exists():
+            continue
+        dst = ROOT / rel
+        safe_mkdir(dst.parent)
+        os.replace(src, dst)
+        moved.append(rel)
+    # shards a shrunken sitemap no longer has
+    for rel in journal.get("removed", []):
+        (ROOT / rel).unlink(missing_ok=True)
+    if fsync_policy == "batch":
+        for d in sorted({(ROOT / rel).parent for rel in moved}):
+            fsync_path(d)
+    shutil.rmtree(STAGING_DIR)
+    return moved
+
+def recover_staging(fsync_policy: str) -> None:
+    # A complete stage (journal present) is finished; a partial one is discarded
+    if not STAGING_DIR.exists():
+        return
+    if (STAGING_DIR / JOURNAL_NAME).exists():
+        moved = commit_staging(fsync_policy)
+        print(f"♻️  Finished interrupted staged run ({len(moved)} files)")
+    else:
+        shutil.rmtree(STAGING_DIR)
+
+def stage_file(rel_path: str, render, manifest: dict, incremental: bool, link_mode: str = "copy") -> tuple:
+    # Like sync_file, but changed content goes into the staging tree
+    start = time.perf_counter()
+    content = render()
+    rendered = time.perf_counter()
+    digest = content_hash(content)
+    note_blob(digest)
+    entry = unchanged_entry(rel_path, digest, manifest) if incremental else None
+    if entry:
+        note_file(rel_path, "unchanged", rendered - start, time.perf_counter() - rendered, 0)
+        return "unchanged", entry
+    p = STAGING_DIR / rel_path
+    os.makedirs(p.parent, exist_ok=True)
+    materialize(p, content, digest, link_mode)
+    note_file(rel_path, "written", rendered - start, time.perf_counter() - rendered, p.stat().st_size)
+    return "written", digest
+
+def write_staged(
+    layout: dict, manifest: dict, incremental: bool, workers: int, plan: dict, fsync_policy: str, link_mode: str = "copy"
+) -> tuple:
+    counts = {"written": 0, "skipped": 0, "unchanged": 0}
+    new_manifest = {}
+    staged = {}
+
+    # Render everything that changes into the sibling tree; the live tree is untouched
+    for f in placeholder_files(layout):
+        if (ROOT / f).exists():
+            counts["skipped"] += 1
+            note_file(f, "skipped", 0.0, 0.0, 0)
+        else:
+            staged[f] = stage_file(f, str, manifest, False)[1]
+    content, kept = writable_content(layout, manifest)
+    counts["skipped"] += len(kept)
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        results = pool.map(
+            lambda item: stage_file(item[0], item[1], manifest, incremental, link_mode),
+            content.items(),
+        )
+        for rel, (status, value) in zip(content, results):
+            if status == "unchanged":
+                counts["unchanged"] += 1
+                new_manifest[rel] = value
+            else:
+                staged[rel] = value
+
+    build_skeleton(plan)
+    counts["written"] += len(staged)
+    for rel in layout["content"]:
+        if rel in staged:
+            new_manifest[rel] = manifest_entry(rel, staged[rel], STAGING_DIR)
+    # swap_staging() moves them in, once the manifest and sitemaps are staged too
+    return counts, new_manifest, list(staged)
+
+def swap_staging(staged: list, removed: list, fsync_policy: str) -> list:
+    # Journal the stage, then roll it into ROOT; returns the files moved
+    if not staged and not removed:
+        shutil.rmtree(STAGING_DIR, ignore_errors=True)
+        return []
+    if fsync_policy == "batch":
+        fsync_batch(STAGING_DIR, staged)
+    journal = STAGING_DIR / JOURNAL_NAME
+    journal.write_text(json.dumps({"files": staged, "removed": removed}), encoding="utf-8")
+    if fsync_policy == "batch":
+        fsync_path(journal)
+        fsync_path(STAGING_DIR)
+
+    # Point of no return: from here a crash is rolled forward by recover_staging()
+    return commit_staging(fsync_policy)
+
+# --------------------------
+# archive output (--archive): no filesystem writes under ROOT
+# --------------------------
+class TarOutput:
+    def __init__(self, fileobj, compress: bool):
+        # gzip header mtime pinned too, so .tar.gz bytes are reproducible
+        self.gz = gzip.GzipFile(filename="", mode="wb", fileobj=fileobj, mtime=ARCHIVE_EPOCH) if compress else None
+        self.tar = tarfile.open(fileobj=self.gz or fileobj, mode="w|", format=tarfile.PAX_FORMAT)
+
+    def add(self, name: str, data: bytes = None) -> None:
+        info = tarfile.TarInfo(name)
+        info.mtime = ARCHIVE_EPOCH
+        if data is None:
+            info.type, info.mode = tarfile.DIRTYPE, 0o755
+            self.tar.addfile(info)
+        else:
+            info.size, info.mode = len(data), 0o644
+            self.tar.addfile(info, io.BytesIO(data))
+
+    def close(self) -> None:
+        self.tar.close()
+        if self.gz:
+            self.gz.close()
+
+class ZipOutput:
+    def __init__(self, fileobj):
+        # zipfile handles unseekable outputs (stdout) with data descriptors
+        self.zip = zipfile.ZipFile(fileobj, "w", zipfile.ZIP_DEFLATED)
+
+    def add(self, name: str, data: bytes = None) -> None:
+        info = zipfile.ZipInfo(name + "/" if data is None else name, time.gmtime(ARCHIVE_EPOCH)[:6])
+        info.external_attr = ((0o40755 << 16) | 0x10) if data is None else (0o100644 << 16)
+        info.compress_type = zipfile.ZIP_DEFLATED
+        self.zip.writestr(info, b"" if data is None else data)
+
+    def close(self) -> None:
+        self.zip.close()
+
+class MemoryOutput:
+    # In-memory tree for tests and tooling: {"path": bytes}, dirs as a set
+    def __init__(self):
+        self.files = {}
+        self.dirs = set()
+
+    def add(self, name: str, data: bytes = None) -> None:
+        if data is None:
+            self.dirs.add(name)
+        else:
+            self.files[name] = data
+
+    def close(self) -> None:
+        pass
+
+def archive_format(path: str, fmt: str) -> str:
+    if fmt:
+        return fmt
+    for suffix, name in ((".tar.gz", "tgz"), (".tgz", "tgz"), (".zip", "zip")):
+        if path.endswith(suffix):
+            return name
+    return "tar"
+
+def open_output(fmt: str, fileobj):
+    if fmt == "zip":
+        return ZipOutput(fileobj)
+    if fmt == "memory":
+        return MemoryOutput()
+    return TarOutput(fileobj, compress=fmt == "tgz")
+
+def write_archive(layout: dict, output) -> dict:
+    # Sorted, so a directory always precedes its contents and output is reproducible;
+    # each file is rendered and streamed into the archive, one at a time
+    entries = {path: None for path, _ in iter_trie(build_path_trie(layout))}
+    entries.update({rel: "" for rel in placeholder_files(layout)})
+    entries.update(layout["content"])
+    counts = {"dirs": 0, "files": 0, "bytes": 0}
+    prefix = ROOT.name
+    output.add(prefix)
+    counts["dirs"] += 1
+    for rel in sorted(entries):
+        source = entries[rel]
+        if source is None:
+            output.add(f"{prefix}/{rel}")
+            counts["dirs"] += 1
+            continue
+        start = time.perf_counter()
+        data = source() if callable(source) else source
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        rendered = time.perf_counter()
+        output.add(f"{prefix}/{rel}", data)
+        note_file(rel, "written", rendered - start, time.perf_counter() - rendered, len(data))
+        counts["files"] += 1
+        counts["bytes"] += len(data)
+    output.close()
+    return counts
+
+# --------------------------
+# sitemaps: streamed per app, sharded at the protocol limits, gzipped
+# --------------------------
+def source_digests(content: dict, seeds, written: dict):
+    # rel -> sha256 of a route source, each computed at most once per run: files
+    # written this run by their manifest entry, seeds by what is on disk (an
+    # implemented tool isn't its stub), anything else by rendering it once
+    @functools.cache
+    def digest(rel: str) -> str:
+        if rel in written:
+            return written[rel]["sha256"]
+        if rel in seeds and (ROOT / rel).is_file():
+            return file_sha256(ROOT / rel)
+        return content_hash(content[rel]()) if rel in content else ""
+    return digest
+
+def route_digests(app_routes: dict, digest) -> dict:
+    # url -> hash over the route's own sources
+    urls = {}
+    for path, sources, _ in app_routes["routes"]:
+        h = hashlib.sha256()
+        for rel in sources:
+            h.update(digest(rel).encode())
+        urls[f"https://{app_routes['host']}{path}"] = h.hexdigest()
+    return urls
+
+def sitemap_entries(digests: dict, ledger: dict, seen: dict, today: str):
+    # (url, lastmod) per route; lastmod only moves when the route's sources hash differently
+    for url, digest in digests.items():
+        previous = ledger.get(url)
+        lastmod = previous[1] if previous and previous[0] == digest else today
+        seen[url] = [digest, lastmod]
+        yield url, lastmod
+
+def urlset_chunks(entries, state: dict):
+    # One shard, stopping before either protocol limit; state["next"] holds the
+    # entry that didn't fit (None when done), state["lastmod"] the shard's newest
+    head = f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{SITEMAP_NS}">\n'
+    tail = "</urlset>\n"
+    yield head
+    size, count = len(head) + len(tail), 0
+    while state["next"] is not None:
+        url, lastmod = state["next"]
+        line = f"  <url><loc>{xml_escape(url)}</loc><lastmod>{lastmod}</lastmod></url>\n"
+        nbytes = len(line.encode("utf-8"))
+        if count == SITEMAP_MAX_URLS or size + nbytes > SITEMAP_MAX_BYTES:
+            break
+        yield line
+        size += nbytes
+        count += 1
+        state["lastmod"] = max(state["lastmod"], lastmod)
+        state["next"] = next(entries, None)
+    yield tail
+
+def stream_sitemap(tmp: Path, chunks) -> str:
+    # Writes the chunks to tmp and tmp.gz in one pass; returns the xml's sha256
+    h = hashlib.sha256()
+    with open(tmp, "wb") as raw, open(f"{tmp}.gz", "wb") as gz_raw, \
+            gzip.GzipFile(filename="", mode="wb", fileobj=gz_raw, mtime=ARCHIVE_EPOCH, compresslevel=9) as gz:
+        for chunk in chunks:
+            data = chunk.encode("utf-8")
+            raw.write(data)
+            gz.write(data)
+            h.update(data)
+    return h.hexdigest()
+
+def gzip_sitemap(data: bytes) -> bytes:
+    # Same header and level as stream_sitemap, so archives match a generated tree
+    buf = io.BytesIO()
+    with gzip.GzipFile(filename="", mode="wb", fileobj=buf, mtime=ARCHIVE_EPOCH, compresslevel=9) as gz:
+        gz.write(data)
+    return buf.getvalue()
+
+def shard_sitemaps(base_url: str, entries, stream) -> list:
+    # [(name, stream(name, chunks))]: sitemap.xml is the urlset itself, or a
+    # sitemap index over sitemap-N.xml shards once the limits are hit. stream
+    # must consume chunks before returning; the next shard continues from it.
+    entries = iter(entries)
+    state = {"next": next(entries, None)}
+    shards = []
+    while state["next"] is not None or not shards:
+        state["lastmod"] = ""
+        shards.append((stream(f"sitemap-{len(shards) + 1}.xml", urlset_chunks(entries, state)), state["lastmod"]))
+    if len(shards) == 1:
+        return [("sitemap.xml", shards[0][0])]
+    rows = [
+        f"  <sitemap><loc>{xml_escape(f'{base_url}/sitemap-{i}.xml')}</loc><lastmod>{lastmod}</lastmod></sitemap>\n"
+        for i, (_, lastmod) in enumerate(shards, 1)
+    ]
+    head = f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="{SITEMAP_NS}">\n'
+    outputs = [(f"sitemap-{i}.xml", out) for i, (out, _) in enumerate(shards, 1)]
+    outputs.append(("sitemap.xml", stream("sitemap.xml", [head, *rows, "</sitemapindex>\n"])))
+    return outputs
+
+def write_app_sitemaps(public: Path, base_url: str, entries, out: Path = None) -> tuple:
+    # Streams every shard to a temp file in out (public itself, or its staging
+    # twin) and moves the changed ones there; returns (replaced, stale) names.
+    # Stale shards are only deleted here when writing straight into public.
+    out = out or public
+
+    def stream(name: str, chunks) -> tuple:
+        tmp = out / f".{name}.tmp"
+        return tmp, stream_sitemap(tmp, chunks)
+
+    outputs = shard_sitemaps(base_url, entries, stream)
+    # unchanged sitemaps keep their mtime, so --incremental/verify/servers see no change
+    replaced = []
+    for name, (tmp, digest) in outputs:
+        target = public / name
+        if target.exists() and (public / f"{name}.gz").exists() and file_sha256(target) == digest:
+            tmp.unlink()
+            Path(f"{tmp}.gz").unlink()
+            continue
+        os.replace(f"{tmp}.gz", out / f"{name}.gz")
+        os.replace(tmp, out / name)
+        replaced.append(name)
+    names = {name for name, _ in outputs}
+    stale = sorted(p.name for p in public.glob("sitemap-*.xml*") if p.name.removesuffix(".gz") not in names)
+    if out == public:
+        for name in stale:
+            (public / name).unlink()
+    return replaced, stale
+
+def load_sitemap_ledger() -> dict:
+    try:
+        return json.loads((ROOT / SITEMAP_LEDGER_NAME).read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def sitemap_today() -> str:
+    epoch = os.environ.get("SOURCE_DATE_EPOCH")
+    return time.strftime("%Y-%m-%d", time.gmtime(int(epoch) if epoch else None))
+
+def on_host(url: str, host: str) -> bool:
+    return url == f"https://{host}" or url.startswith(f"https://{host}/")
+
+def write_sitemaps(routes: dict, digest, stage: Path = None) -> dict:
+    # digest covers the full layout, so lastmods don't depend on --only/--glob.
+    # With a stage (--staged), changed files and the ledger go there instead,
+    # listed under "staged"/"removed" for swap_staging().
+    ledger = load_sitemap_ledger()
+    today = sitemap_today()
+    seen, written, staged, removed = {}, 0, [], []
+    for app, app_routes in sorted(routes.items()):
+        public = ROOT / "apps" / app / "public"
+        digests = route_digests(app_routes, digest)
+        previous = {url: e for url, e in ledger.items() if on_host(url, app_routes["host"])}
+        # Same URLs and digests as last run: the lastmods and so the files would
+        # come out byte-identical, so only check that they are still there
+        if digests == {url: e[0] for url, e in previous.items()} and \
+                (public / "sitemap.xml").exists() and (public / "sitemap.xml.gz").exists():
+            seen.update(previous)
+            continue
+        entries = list(sitemap_entries(digests, ledger, seen, today))
+        rel_dir = f"apps/{app}/public"
+        if stage:
+            os.makedirs(stage / rel_dir, exist_ok=True)
+        else:
+            safe_mkdir(public)
+        replaced, stale = write_app_sitemaps(
+            public, f"https://{app_routes['host']}", entries, stage / rel_dir if stage else None
+        )
+        written += len(replaced)
+        if stage:
+            staged += [f"{rel_dir}/{name}{ext}" for name in replaced for ext in ("", ".gz")]
+            removed += [f"{rel_dir}/{name}" for name in stale]
+    # URLs of apps outside this run's selection keep their ledger entries
+    kept = {url: e for url, e in ledger.items() if not any(on_host(url, r["host"]) for r in routes.values())}
+    if {**kept, **seen} != ledger:
+        base = stage or ROOT
+        tmp = base / f"{SITEMAP_LEDGER_NAME}.tmp"
+        tmp.write_text(json.dumps({**kept, **seen}, indent=1, sort_keys=True) + "\n", encoding="utf-8")
+        os.replace(tmp, base / SITEMAP_LEDGER_NAME)
+        if stage:
+            staged.append(SITEMAP_LEDGER_NAME)
+    return {"urls": len(seen), "written": written, "staged": staged, "removed": removed}
+
+def sitemap_content(routes: dict, digest, gz: bool = False) -> dict:
+    # {rel: text, or gzip bytes} of what write_sitemaps would produce, for --plan and
+    # --archive; lastmods come from the ledger, which is only read here
+    ledger = load_sitemap_ledger()
+    today = sitemap_today()
+    files = {}
+    for app, app_routes in sorted(routes.items()):
+        entries = sitemap_entries(route_digests(app_routes, digest), ledger, {}, today)
+        for name, text in shard_sitemaps(f"https://{app_routes['host']}", entries, lambda _, chunks: "".join(chunks)):
+            files[f"apps/{app}/public/{name}"] = text
+            if gz:
+                files[f"apps/{app}/public/{name}.gz"] = gzip_sitemap(text.encode("utf-8"))
+    return files
+
+def with_sitemaps(layout: dict, content: dict, gz: bool = False) -> dict:
+    # The layout with its sitemap placeholders replaced by their real content
+    if not layout.get("routes"):
+        return layout
+    digest = source_digests(content, layout.get("seeds", ()), {})
+    sitemaps = {rel: static(data) for rel, data in sitemap_content(layout["routes"], digest, gz).items()}
+    return {**layout, "content": {**layout["content"], **sitemaps}}
+
+# --------------------------
+# prerender: one HTML file per route in apps/*/dist, head baked in
+# --------------------------
+def jsx_style(match) -> str:
+    # style={{ padding: 24, flexWrap: "wrap" }} -> style="padding:24px;flex-wrap:wrap"
+    rules = []
+    for key, value in JSX_STYLE_RULE.findall(match.group(1)):
+        prop = re.sub(r"[A-Z]", lambda m: f"-{m.group(0).lower()}", key)
+        value = value.strip("\"'")
+        rules.append(f"{prop}:{value}px" if value.isdigit() else f"{prop}:{value}")
+    return f'style="{";".join(rules)}"'
+
+def static_markup(source: str) -> tuple:
+    # (SeoHead string props, markup as HTML); the markup is None when React has
+    # to render the page (expressions, handlers or components left in it)
+    match = JSX_RETURN.search(source)
+    if not match:
+        return {}, None
+    seo = JSX_SEO_HEAD.search(match.group(1))
+    props = dict(JSX_PROP.findall(seo.group(1))) if seo else {}
+    markup = JSX_STYLE.sub(jsx_style, JSX_SEO_HEAD.sub("", match.group(1))).replace("className=", "class=")
+    if "{" in markup or re.search(r"<[A-Z]", markup):
+        return props, None
+    return props, markup
+
+def prerender_shell(dist: Path):
+    # A fresh build's index.html is the shell; after prerendering it's the "/"
+    # page, so later runs start from the saved copy
+    try:
+        page = (dist / "index.html").read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return None
+    if PRERENDER_BEGIN not in page:
+        (dist / PRERENDER_SHELL).write_text(page, encoding="utf-8")
+        return page
+    try:
+        return (dist / PRERENDER_SHELL).read_text(encoding="utf-8")
+    except FileNotFoundError:
+        raise SystemExit(f"❌ {dist / 'index.html'} is prerendered but {PRERENDER_SHELL} is gone; rebuild the app")
+
+def prerender_page(shell: str, app_routes: dict, path, source, head: tuple) -> tuple:
+    # Static pages get their markup inlined into #root for the first paint;
+    # every page keeps the module scripts, so React then renders it inside the
+    # app's layout (header, nav, footer), which the page source doesn't have.
+    # path is None for 404.html: served for any URL, so no canonical and noindex.
+    props, body = static_markup(source) if source is not None else ({}, None)
+    title = props.get("title") or (head and head[0]) or app_routes["head"][0]
+    description = props.get("description") or (head and head[1]) or app_routes["head"][1]
+    title, description = html.escape(title), html.escape(description)
+    if path is None:
+        url_tags = ['    <meta name="robots" content="noindex" />']
+    else:
+        canonical = html.escape(f"https://{app_routes['host']}{props.get('path', path)}")
+        url_tags = [f'    <link rel="canonical" href="{canonical}" />', f'    <meta property="og:url" content="{canonical}" />']
+    tags = "\n".join([
+        f"    {PRERENDER_BEGIN}",
+        f"    <title>{title}</title>",
+        f'    <meta name="description" content="{description}" />',
+        url_tags[0],
+        f'    <meta property="og:title" content="{title}" />',
+        f'    <meta property="og:description" content="{description}" />',
+        *url_tags[1:],
+        f"    {PRERENDER_END}",
+    ])
+    page = re.sub(r"\s*<title>.*?</title>", "", shell, count=1, flags=re.S)
+    end = page.index("</head>")
+    page = f"{page[:end].rstrip()}\n{tags}\n  {page[end:]}"
+    if body is None:
+        return page, False
+    return page.replace('<div id="root"></div>', f'<div id="root">{body}</div>', 1), True
+
+def prerender_jobs(app_routes: dict, content: dict):
+    # (output name, route path or None for 404.html, page source rel, head)
+    for path, sources, head in app_routes["routes"]:
+        name = "index.html" if path == "/" else f"{path.strip('/')}/index.html"
+        source = None if head else next((rel for rel in sources if "/src/pages/" in rel), None)
+        yield name, path, source, head
+    if app_routes.get("notfound"):
+        yield "404.html", None, app_routes["notfound"], ()
+
+def write_prerendered(dist: Path, name: str, page: str) -> bool:
+    target = dist / name
+    data = page.encode("utf-8")
+    try:
+        if target.read_bytes() == data:
+            return False
+    except FileNotFoundError:
+        target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f".{target.name}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, target)
+    return True
+
+def prerender_app(dist: Path, shell: str, app_routes: dict, content: dict, pool) -> dict:
+    def one(job):
+        name, path, source, head = job
+        page, is_static = prerender_page(shell, app_routes, path, content[source]() if source in content else None, head)
+        return name, is_static, write_prerendered(dist, name, page)
+
+    results = list(pool.map(one, prerender_jobs(app_routes, content)))
+    # pages of routes that are gone are removed; a rebuild clears dist anyway
+    try:
+        previous = json.loads((dist / PRERENDER_LEDGER).read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        previous = []
+    names = sorted(name for name, _, _ in results)
+    for stale in set(previous) - set(names):
+        (dist / stale).unlink(missing_ok=True)
+        try:
+            (dist / stale).parent.rmdir()  # only succeeds once the route dir is empty
+        except OSError:
+            pass
+    (dist / PRERENDER_LEDGER).write_text(json.dumps(names, indent=1) + "\n", encoding="utf-8")
+    return {
+        "routes": len(results),
+        "static": sum(is_static for _, is_static, _ in results),
+        "written": sum(written for _, _, written in results),
+    }
+
+def run_prerender(args: argparse.Namespace) -> None:
+    set_root(args.root)
+    everything, layout = load_layout(args)
+    totals = collections.Counter()
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        for app, app_routes in sorted(layout["routes"].items()):
+            dist = ROOT / "apps" / app / "dist"
+            shell = prerender_shell(dist)
+            if shell is None:
+                print(f"⏭️  apps/{app}: no dist/index.html yet (run its vite build first)")
+                continue
+            result = prerender_app(dist, shell, app_routes, everything["content"], pool)
+            totals.update(result)
+            totals["apps"] += 1
+            print(f"🧊 apps/{app}: {result['routes']} routes ({result['static']} with inlined markup), {result['written']} written")
+    if not totals["apps"]:
+        raise SystemExit("❌ Nothing to prerender: build the apps first.")
+    print(
+        f"✅ Prerendered {totals['routes']} routes in {totals['apps']} apps: "
+        f"{totals['static']} with inlined markup, {totals['routes'] - totals['static']} head only, "
+        f"{totals['written']} written"
+    )
+
+# --------------------------
+# dry run (--plan)
+# --------------------------
+def compare_file(rel_path: str, render, manifest: dict) -> str:
+    # Cheapest check first: manifest + stat, then size, then a full hash
+    p = ROOT / rel_path
+    try:
+        st = p.stat()
+    except FileNotFoundError:
+        return "created"
+    data = render().encode("utf-8")
+    digest = hashlib.sha256(data).hexdigest()
+    entry = manifest.get(rel_path)
+    if entry and entry["sha256"] == digest and st.st_size == entry["size"] and st.st_mtime_ns == entry["mtime_ns"]:
+        return "unchanged"
+    if st.st_size != len(data):
+        return "modified"
+    return "unchanged" if hashlib.sha256(p.read_bytes()).hexdigest() == digest else "modified"
+
+def plan_changes(layout: dict, manifest: dict, workers: int) -> dict:
+    changes = {"created": [], "modified": [], "unchanged": [], "placeholders": []}
+    content, kept = writable_content(layout, manifest)
+    changes["placeholders"].extend(sorted(kept))
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        statuses = pool.map(lambda item: compare_file(item[0], item[1], manifest), content.items())
+        for rel, status in zip(content, statuses):
+            changes[status].append(rel)
+    for f in placeholder_files(layout):
+        changes["placeholders" if (ROOT / f).exists() else "created"].append(f)
+    return changes
+
+def print_plan(layout: dict, changes: dict, show_diff: bool) -> None:
+    for rel in changes["created"]:
+        print(f"+ {rel}")
+    for rel in changes["modified"]:
+        print(f"~ {rel}")
+    print(f"🆕 Created: {len(changes['created'])} | ✏️  Modified: {len(changes['modified'])} | "
+          f"💤 Unchanged: {len(changes['unchanged'])} | 📄 Untouched placeholders: {len(changes['placeholders'])}")
+    if not show_diff:
+        return
+    # Only files that already failed the hash compare are read and diffed
+    for rel in changes["modified"]:
+        old = (ROOT / rel).read_text(encoding="utf-8", errors="replace").splitlines(keepends=True)
+        new = layout["content"][rel]().splitlines(keepends=True)
+        sys.stdout.writelines(difflib.unified_diff(old, new, fromfile=f"a/{rel}", tofile=f"b/{rel}"))
+
+# --------------------------
+# verify (python 1.py verify): Merkle diff of expected vs on-disk tree
+# --------------------------
+def scan_tree(root: Path) -> tuple:
+    # ({rel: stat}, {rel dirs}) under root, without VERIFY_SKIP_DIRS and our own bookkeeping
+    files, dirs = {}, set()
+    stack = [("", root)]
+    while stack:
+        prefix, path = stack.pop()
+        with os.scandir(path) as entries:
+            for entry in entries:
+                rel = f"{prefix}{entry.name}"
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in VERIFY_SKIP_DIRS:
+                        dirs.add(rel)
+                        stack.append((f"{rel}/", entry.path))
+                elif prefix or entry.name not in (MANIFEST_NAME, VERIFY_STATE_NAME, SITEMAP_LEDGER_NAME, BUILD_STATE_NAME, BUNDLE_STATE_NAME,
+                                                     COMPRESS_STATE_NAME):
+                    files[rel] = entry.stat(follow_symlinks=False)
+    return files, dirs
+
+def file_sha256(path: Path) -> str:
+    with open(path, "rb") as fh:
+        return hashlib.file_digest(fh, "sha256").hexdigest()
+
+def merkle_tree(leaves: dict, dirs) -> dict:
+    # {dir: {name: digest}} with every directory's own "d:" digest filled into
+    # its parent, deepest first; "" is ROOT. dirs must include all ancestors.
+    children = {d: {} for d in ("", *dirs)}
+    for rel, digest in leaves.items():
+        parent, _, name = rel.rpartition("/")
+        children[parent][name] = digest
+    for d in sorted(children, key=lambda d: d.count("/") if d else -1, reverse=True):
+        items = children[d]
+        digest = "d:" + hashlib.sha256("".join([f"{n}\0{items[n]}\n" for n in sorted(items)]).encode()).hexdigest()
+        parent, _, name = d.rpartition("/")
+        children[parent][name] = digest  # ROOT's own digest lands under children[""][""]
+    return children
+
+def diff_trees(expected: dict, actual: dict, d: str = ""):
+    # Only descends into directories whose digests differ
+    exp, act = expected.get(d, {}), actual.get(d, {})
+    for name in sorted(set(exp) | set(act)):
+        if not name or exp.get(name) == act.get(name):
+            continue
+        rel = f"{d}/{name}" if d else name
+        if name not in act:
+            yield "missing", rel
+        elif name not in exp:
+            yield "orphaned", rel
+        elif exp[name].startswith("d:") and act[name].startswith("d:"):
+            yield from diff_trees(expected, actual, rel)
+        else:
+            yield "drifted", rel
+
+def verify_tree(layout: dict, workers: int, only: list, globs: list) -> dict:
+    start = time.perf_counter()
+    # expected: rendered hashes; placeholders and seeds (tool stubs, which get
+    # replaced by the real tools) only need to exist
+    seeds = layout.get("seeds", frozenset())
+    expected = {rel: content_hash(render()) for rel, render in layout["content"].items() if rel not in seeds}
+    expected.update({rel: "placeholder" for rel in [*placeholder_files(layout), *(seeds & set(layout["content"]))]})
+    expected_dirs = {path for path, _ in iter_trie(build_path_trie(layout))}
+
+    files, dirs = scan_tree(ROOT) if ROOT.is_dir() else ({}, set())
+    # sitemap shards and .gz copies are written by the sitemaps phase, .gz/.br
+    # siblings of generated files by compress; neither is part of the layout
+    files = {
+        rel: st for rel, st in files.items()
+        if rel in expected or not SITEMAP_EXTRA.search(rel) and rel.removesuffix(".gz").removesuffix(".br") not in expected
+    }
+    if only or globs:
+        files = {rel: st for rel, st in files.items() if path_selected(rel, only, globs)}
+        dirs = {d for d in dirs if d in expected_dirs or path_selected(d, only, globs)}
+
+    # on-disk hashes: reuse the manifest/verify state when size and mtime match
+    try:
+        state = json.loads((ROOT / VERIFY_STATE_NAME).read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        state = {}
+    known = {**load_manifest(), **state}
+    actual, rehash = {}, []
+    for rel, st in files.items():
+        if rel not in expected:
+            actual[rel] = "orphan"
+        elif expected[rel] == "placeholder":
+            actual[rel] = "placeholder"
+        else:
+            entry = known.get(rel)
+            if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+                actual[rel] = entry["sha256"]
+            else:
+                rehash.append(rel)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for rel, digest in zip(rehash, pool.map(lambda rel: file_sha256(ROOT / rel), rehash)):
+            actual[rel] = digest
+            st = files[rel]
+            state[rel] = {"sha256": digest, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    if ROOT.is_dir() and (rehash or set(state) - set(files)):
+        state = {rel: e for rel, e in state.items() if rel in files}
+        tmp = ROOT / f"{VERIFY_STATE_NAME}.tmp"
+        tmp.write_text(json.dumps(state, indent=1, sort_keys=True) + "\n", encoding="utf-8")
+        os.replace(tmp, ROOT / VERIFY_STATE_NAME)
+
+    expected_tree = merkle_tree(expected, expected_dirs)
+    actual_tree = merkle_tree(actual, dirs)
+    result = {"drifted": [], "missing": [], "orphaned": []}
+    for kind, rel in diff_trees(expected_tree, actual_tree):
+        result[kind].append(rel)
+    return {
+        **result,
+        "expected_root": expected_tree[""][""],
+        "actual_root": actual_tree[""][""],
+        "files": len(files),
+        "rehashed": len(rehash),
+        "seconds": time.perf_counter() - start,
+    }
+
+def print_verify(result: dict) -> None:
+    print(
+        f"🌳 Merkle root {result['expected_root'][2:14]} expected, {result['actual_root'][2:14]} on disk "
+        f"({result['files']} files, {result['rehashed']} re-hashed, {result['seconds'] * 1e3:.1f} ms)"
+    )
+    for kind, icon in (("drifted", "✏️ "), ("missing", "❓"), ("orphaned", "🗑️ ")):
+        for rel in result[kind]:
+            print(f"{icon} {kind:<8} {rel}")
+    if not (result["drifted"] or result["missing"] or result["orphaned"]):
+        print("✅ No drift")
+
+def run_verify(args: argparse.Namespace) -> None:
+    set_root(args.root)
+    _, layout = load_layout(args)
+    result = verify_tree(layout, args.workers, args.only, args.glob)
+    if args.report == "json":
+        json.dump(result, sys.stdout, indent=1)
+        print()
+    else:
+        print_verify(result)
+    raise SystemExit(1 if result["drifted"] or result["missing"] or result["orphaned"] else 0)
+
+# --------------------------
+# watch (python 1.py watch): re-render only outputs whose inputs changed
+# --------------------------
+def open_inotify(dirs: list):
+    # (fd, libc) watching dirs, or None where inotify isn't available. Dirs
+    # rather than files, since editors often save by renaming over the file.
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    for d in dirs:
+        if libc.inotify_add_watch(fd, os.fsencode(d), INOTIFY_MASK) < 0:
+            os.close(fd)
+            return None
+    return fd
+
+def read_inotify(fd: int) -> set:
+    # Names of the entries touched by the pending events
+    data = os.read(fd, 64 * 1024)
+    names, offset = set(), 0
+    while offset < len(data):
+        _, _, _, length = struct.unpack_from("iIII", data, offset)
+        offset += 16
+        names.add(os.fsdecode(data[offset:offset + length].rstrip(b"\0")))
+        offset += length
+    return names
+
+def poll_snapshot(paths: list) -> dict:
+    snapshot = {}
+    for p in paths:
+        try:
+            st = p.stat()
+            snapshot[p] = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            snapshot[p] = None
+    return snapshot
+
+def watch_batches(paths: list):
+    # Yields the set of changed paths, debounced: a batch is only yielded once
+    # no further change arrived for WATCH_DEBOUNCE seconds
+    paths = [p.resolve() for p in paths]
+    fd = open_inotify(sorted({str(p.parent) for p in paths}))
+    print(f"👀 Watching {', '.join(p.name for p in paths)} ({'inotify' if fd is not None else 'polling'})")
+    snapshot = poll_snapshot(paths)
+    while True:
+        if fd is not None:
+            names = read_inotify(fd)
+            while select.select([fd], [], [], WATCH_DEBOUNCE)[0]:
+                names |= read_inotify(fd)
+            changed = {p for p in paths if p.name in names}
+        else:
+            time.sleep(WATCH_POLL_INTERVAL)
+            current = poll_snapshot(paths)
+            if current == snapshot:
+                continue
+            while True:
+                time.sleep(WATCH_DEBOUNCE)
+                settled = poll_snapshot(paths)
+                if settled == current:
+                    break
+                current = settled
+            changed = {p for p in paths if current[p] != snapshot[p]}
+            snapshot = current
+        if changed:
+            yield changed
+
+def reload_templates(source: Path) -> set:
+    # Re-executes the generator's source for its TEMPLATES (guarded by
+    # __main__, so nothing runs) and swaps them in; returns the changed names
+    module_spec = importlib.util.spec_from_file_location("_watched_templates", source)
+    module = importlib.util.module_from_spec(module_spec)
+    module_spec.loader.exec_module(module)
+    changed = {n for n in {*TEMPLATES, *module.TEMPLATES} if TEMPLATES.get(n) != module.TEMPLATES.get(n)}
+    TEMPLATES.clear()
+    TEMPLATES.update(module.TEMPLATES)
+    render_shared.cache_clear()
+    return changed
+
+def affected_paths(old: dict, new: dict, templates: set) -> list:
+    # Outputs whose spec entry changed, or whose template source changed
+    return sorted(
+        rel for rel, entry in new["content"].items()
+        if old["content"].get(rel) != entry or (entry[0] == "template" and entry[1] in templates)
+    )
+
+def apply_changes(args: argparse.Namespace, old: dict, new: dict, templates: set) -> dict:
+    everything = layout_from_compiled(new)
+    selected = lambda rel: path_selected(rel, args.only, args.glob)
+    changed = [rel for rel in affected_paths(old, new, templates) if selected(rel)]
+    old_dirs, old_files, changed_set = set(old["dirs"]), set(old["files"]), set(changed)
+    layout = {
+        "dirs": [d for d in new["dirs"] if d not in old_dirs and selected(d)],
+        "files": [f for f in new["files"] if (f not in old_files or f in changed_set) and selected(f)],
+        "content": {rel: everything["content"][rel] for rel in changed},
+        "seeds": everything["seeds"],
+    }
+    reset_run_stats()
+    manifest = load_manifest()
+    # incremental: an affected file whose render didn't actually change is left alone
+    counts, entries = write_serial(layout, manifest, True, args.link_mode)
+    if {**manifest, **entries} != manifest:
+        save_manifest({**manifest, **entries})
+    # route sources may have changed even when no sitemap path was affected
+    routes = {app: r for app, r in new["routes"].items() if selected(f"apps/{app}/public/sitemap.xml")}
+    digest = source_digests(everything["content"], everything["seeds"], entries)
+    sitemaps = write_sitemaps(routes, digest)["written"] if routes else 0
+    return {"affected": changed, **counts, "sitemaps": sitemaps}
+
+def run_watch(args: argparse.Namespace) -> None:
+    set_root(args.root)
+    source = Path(__file__).resolve()
+    reset_run_stats()
+    compiled = load_compiled_spec(args.spec, not args.no_cache)
+    everything = layout_from_compiled(compiled)
+    layout = select_layout(everything, args.only, args.glob)
+    args.incremental = True
+    counts = generate(args, everything, layout, plan_dirs(layout))
+    print(f"✅ In sync under {ROOT.resolve()} ({counts['written']} written, {counts['unchanged']} unchanged)")
+
+    try:
+        for changed in watch_batches([args.spec, source]):
+            start = time.perf_counter()
+            try:
+                templates = reload_templates(source) if source in changed else set()
+                new, problems = compile_spec(json.loads(args.spec.read_bytes()))
+            except Exception as exc:  # half-saved edits: report and keep watching
+                print(f"❌ {type(exc).__name__}: {exc}")
+                continue
+            if problems:
+                print("\n".join([f"❌ {args.spec}:", *(f"  - {p}" for p in problems)]))
+                continue
+            result = apply_changes(args, compiled, new, templates)
+            compiled = new
+            written = [rel for _, rel, status, _ in RUN_STATS["timings"] if status == "written"]
+            print(
+                f"🔁 {len(result['affected'])} affected, {result['written']} written, {result['unchanged']} unchanged "
+                f"in {(time.perf_counter() - start) * 1e3:.1f} ms"
+                + (f", {result['sitemaps']} sitemaps rewritten" if result["sitemaps"] else "")
+                + (f" (templates: {', '.join(sorted(templates))})" if templates else "")
+            )
+            for rel in written[:args.slowest]:
+                print(f"  ✍️  {rel}")
+    except KeyboardInterrupt:
+        print("👋 Stopped watching")
+
+# --------------------------
+# build (python 1.py build): workspace graph, input-hash cache, parallel builds
+# --------------------------
+def workspace_graph(layout: dict) -> dict:
+    # node ("apps/main", "packages/core-ui") -> nodes it builds after: every app
+    # waits for all packages, packages for the packages their package.json names
+    nodes = sorted({
+        "/".join(rel.split("/")[:2])
+        for rel in (*layout["dirs"], *layout["files"])
+        if rel.startswith(("apps/", "packages/")) and rel.count("/") >= 1
+    })
+    manifests = {node: read_package_json(ROOT / node) for node in nodes}
+    by_name = {m["name"]: node for node, m in manifests.items() if isinstance(m.get("name"), str)}
+    packages = {node for node in nodes if node.startswith("packages/")}
+    graph = {}
+    for node in nodes:
+        named = set()
+        for key in ("dependencies", "devDependencies", "peerDependencies"):
+            named.update(by_name[dep] for dep in manifests[node].get(key) or {} if dep in by_name)
+        graph[node] = (named | (packages if node.startswith("apps/") else set())) - {node}
+    return graph
+
+def read_package_json(path: Path) -> dict:
+    try:
+        manifest = json.loads((path / "package.json").read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):  # placeholders are empty files
+        return {}
+    return manifest if isinstance(manifest, dict) else {}
+
+def build_order(graph: dict) -> list:
+    # Kahn's algorithm; a cycle can't be built in any order
+    order, done = [], set()
+    while len(order) < len(graph):
+        ready = sorted(node for node, deps in graph.items() if node not in done and deps <= done)
+        if not ready:
+            raise SystemExit(f"❌ Workspace dependency cycle between {sorted(set(graph) - done)}")
+        order += ready
+        done.update(ready)
+    return order
+
+def hash_inputs(paths: list, state: dict, pool) -> str:
+    # sha256 over (rel, file sha256) of every file under paths (files or dirs,
+    # relative to ROOT); file hashes are reused while size and mtime match
+    files = {}
+    for rel in paths:
+        path = ROOT / rel
+        if path.is_dir():
+            found, _ = scan_tree(path)
+            files.update({f"{rel}/{sub}": st for sub, st in found.items()})
+        elif path.is_file():
+            files[rel] = path.stat()
+    rehash = [
+        rel for rel, st in files.items()
+        if state.get(rel, {}).get("size") != st.st_size or state[rel]["mtime_ns"] != st.st_mtime_ns
+    ]
+    for rel, digest in zip(rehash, pool.map(lambda rel: file_sha256(ROOT / rel), rehash)):
+        state[rel] = {"sha256": digest, "size": files[rel].st_size, "mtime_ns": files[rel].st_mtime_ns}
+    h = hashlib.sha256()
+    for rel in sorted(files):
+        h.update(f"{rel}\0{state[rel]['sha256']}\0".encode())
+    return h.hexdigest()
+
+def needs_install(cwd: Path) -> bool:
+    # no node_modules in the node or at the workspace root to resolve from
+    return not (cwd / "node_modules").is_dir() and not (ROOT / "node_modules").is_dir()
+
+def build_node(node: str, command: list) -> dict:
+    # npm install first when no node_modules can be resolved, then the build script
+    cwd = ROOT / node
+    start = time.perf_counter()
+    steps = [NPM_INSTALL, command] if needs_install(cwd) else [command]
+    for step in steps:
+        proc = subprocess.run(step, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        if proc.returncode:
+            return {"status": "failed", "seconds": time.perf_counter() - start, "log": proc.stdout, "step": shlex.join(step)}
+    return {"status": "built", "seconds": time.perf_counter() - start}
+
+def run_build(args: argparse.Namespace) -> None:
+    set_root(args.root)
+    command = shlex.split(args.cmd)
+    if not command or shutil.which(command[0]) is None:
+        raise SystemExit(f"❌ {command[0] if command else 'build command'} not found on PATH")
+    everything, layout = load_layout(args)
+    graph = workspace_graph(everything)
+    selected = {node for node in graph if any(rel.startswith(f"{node}/") for rel in (*layout["dirs"], *layout["files"]))}
+    graph = {node: deps & selected for node, deps in graph.items() if node in selected}
+    order = build_order(graph)
+
+    state_path = ROOT / BUILD_STATE_NAME
+    try:
+        state = json.loads(state_path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        state = {}
+    nodes_state, file_state = state.get("nodes", {}), state.get("files", {})
+
+    start = time.perf_counter()
+    results, digests = {}, {}
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        shared = hash_inputs(list(BUILD_SHARED_INPUTS), file_state, pool)
+        for node in order:
+            h = hashlib.sha256(f"{shared}\0{args.cmd}\0".encode())
+            for dep in sorted(graph[node]):
+                h.update(f"{dep}\0{digests[dep]}\0".encode())
+            h.update(hash_inputs([node], file_state, pool).encode())
+            digests[node] = h.hexdigest()
+            if "build" not in (read_package_json(ROOT / node).get("scripts") or {}):
+                results[node] = {"status": "no build script", "seconds": 0.0}
+            elif not args.force and nodes_state.get(node, {}).get("inputs") == digests[node] and (ROOT / node / "dist").is_dir():
+                results[node] = {"status": "cached", "seconds": 0.0}
+    hash_seconds = time.perf_counter() - start
+
+    # Builds are child processes; threads only wait on them. A node starts as
+    # soon as everything it depends on has been built or found in the cache.
+    pending = [node for node in order if node not in results]
+    running = {}
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        while pending or running:
+            for node in list(pending):
+                deps = [results.get(dep, {}).get("status") for dep in graph[node]]
+                if any(status in ("failed", "blocked") for status in deps):
+                    results[node] = {"status": "blocked", "seconds": 0.0}
+                    pending.remove(node)
+                elif all(status is not None for status in deps):
+                    print(f"🔨 {node}: {args.cmd}", file=sys.stderr if args.report == "json" else sys.stdout)
+                    running[pool.submit(build_node, node, command)] = node
+                    pending.remove(node)
+            if not running:
+                continue
+            finished = next(as_completed(running))
+            node = running.pop(finished)
+            results[node] = finished.result()
+            if results[node]["status"] == "built":
+                nodes_state[node] = {"inputs": digests[node], "seconds": round(results[node]["seconds"], 3)}
+            else:
+                nodes_state.pop(node, None)
+    wall = time.perf_counter() - start
+
+    files_under = tuple(f"{rel}/" for rel in BUILD_SHARED_INPUTS) + tuple(f"{node}/" for node in graph)
+    state = {
+        "nodes": nodes_state,
+        "files": {rel: e for rel, e in file_state.items() if rel in BUILD_SHARED_INPUTS or rel.startswith(files_under)},
+    }
+    tmp = ROOT / f"{BUILD_STATE_NAME}.tmp"
+    tmp.write_text(json.dumps(state, indent=1, sort_keys=True) + "\n", encoding="utf-8")
+    os.replace(tmp, state_path)
+
+    counts = collections.Counter(r["status"] for r in results.values())
+    buildable = counts["built"] + counts["cached"] + counts["failed"] + counts["blocked"]
+    hit_rate = counts["cached"] / buildable if buildable else 0.0
+    if args.report == "json":
+        json.dump({
+            "seconds": wall,
+            "hash_seconds": hash_seconds,
+            "hit_rate": hit_rate,
+            "nodes": {node: {k: v for k, v in r.items() if k != "log"} for node, r in results.items()},
+        }, sys.stdout, indent=1)
+        print()
+    else:
+        for node in order:
+            r = results[node]
+            icon = {"built": "✅", "cached": "💤", "failed": "❌", "blocked": "⛔"}.get(r["status"], "⏭️ ")
+            print(f"  {icon} {node:<24} {r['status']:<16} {r['seconds']:>7.2f} s")
+            if r["status"] == "failed":
+                print(f"     {r['step']} failed:")
+                for line in r["log"].rstrip().splitlines()[-20:]:
+                    print(f"     | {line}")
+        build_seconds = sum(r["seconds"] for r in results.values())
+        print(
+            f"🏗️  {counts['built']} built, {counts['cached']} cached ({hit_rate:.0%} hit rate), "
+            f"{counts['failed']} failed, {counts['blocked']} blocked in {wall:.2f} s "
+            f"({build_seconds:.2f} s of builds, {hash_seconds * 1e3:.0f} ms hashing inputs)"
+        )
+    if counts["failed"] or counts["blocked"]:
+        raise SystemExit(1)
+
+# --------------------------
+# dev (python 1.py dev): every app's dev server, one terminal
+# --------------------------
+def read_text(path: Path) -> str:
+    try:
+        return path.read_text(encoding="utf-8")
+    except (FileNotFoundError, UnicodeDecodeError):
+        return ""
+
+def vite_port_pins(apps: list) -> dict:
+    # app -> (port, strictPort) from server.port in the on-disk vite.config.js
+    pins = {}
+    for app in apps:
+        config = read_text(ROOT / "apps" / app / "vite.config.js")
+        match = VITE_PORT_PIN.search(config)
+        if match:
+            pins[app] = (int(match.group(1)), bool(VITE_STRICT_PORT.search(config)))
+    return pins
+
+def dev_ports(layout: dict) -> tuple:
+    # (app -> port, warnings). The on-disk .env overrides of an app
+    # (VITE_<KEY>_URL=http://localhost:N) give the port of the app KEY names,
+    # through the app's URLS constants or else by name; that app itself runs on
+    # vite's default port. Other apps keep a free vite.config.js pin, then get
+    # the next free ports. Pins that lose out are reported, not obeyed: the
+    # --port flag overrides them.
+    by_origin = {f"https://{r['host']}": app for app, r in layout["routes"].items()}
+    content = layout["content"]
+    ports, owner, warnings = {}, {}, []
+    for app in sorted(layout["routes"]):
+        # what vite loads, which may have drifted from the spec's MAIN_ENV
+        env = read_text(ROOT / "apps" / app / ".env")
+        if not env:
+            continue
+        urls = content.get(f"apps/{app}/{URLS_MODULE}")
+        origins = dict(URLS_ENTRY.findall(urls())) if urls else {}
+        for key, url in ENV_URL.findall(env):
+            target = by_origin.get(origins.get(key, ""), key.lower())
+            local = ENV_LOCAL_URL.match(url)
+            if not local:
+                warnings.append(f"apps/{app}/.env points {key} at {url}, not at a local dev server")
+            elif target in layout["routes"] and target not in ports:
+                ports[target], owner[target] = int(local.group(1)), f"apps/{app}/.env"
+        ports.setdefault(app, DEV_BASE_PORT)
+        owner.setdefault(app, "vite's default")
+    clashes = sorted(port for port, n in collections.Counter(ports.values()).items() if n > 1)
+    if clashes:
+        raise SystemExit(f"❌ Dev ports {clashes} are claimed by more than one app")
+
+    pins = vite_port_pins(sorted(layout["routes"]))
+    for app, (port, _) in sorted(pins.items()):
+        if app not in ports and port not in ports.values():
+            ports[app], owner[app] = port, "its vite.config.js"
+    following = max([DEV_BASE_PORT - 1, *ports.values()]) + 1
+    for app in sorted(layout["routes"]):
+        if app not in ports:
+            ports[app], owner[app], following = following, "the next free port", following + 1
+
+    taken = {port: app for app, port in ports.items()}
+    for app, (port, strict) in sorted(pins.items()):
+        if ports[app] == port:
+            continue
+        clash = f", the port of {taken[port]}" if port in taken else ""
+        warnings.append(
+            f"apps/{app}/vite.config.js pins port {port}{' (strictPort)' if strict else ''}{clash}; "
+            f"dev runs {app} on {ports[app]} from {owner[app]}"
+        )
+    return ports, warnings
+
+def dev_hostname(host: str) -> str:
+    # tools.tryatlabs.com -> tools.localhost, the apex -> localhost
+    labels = host.split(".")
+    return f"{labels[0]}.localhost" if len(labels) > 2 else "localhost"
+
+def dev_ready(port: int, proc, deadline: float) -> bool:
+    # True once the server answers HTTP; False if it exits or the deadline passes
+    while time.monotonic() < deadline and proc.poll() is None:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+        try:
+            conn.request("GET", "/")
+            if conn.getresponse().status < 500:
+                return True
+        except OSError:
+            time.sleep(0.1)
+        finally:
+            conn.close()
+    return False
+
+class DevProxyHandler(http.server.BaseHTTPRequestHandler):
+    # Host: tools.localhost:PORT -> 127.0.0.1:<tools dev port>; self.server.ports
+    # maps hostnames to ports. Websocket upgrades aren't proxied: vite's HMR
+    # client falls back to connecting to the dev server's own port.
+    protocol_version = "HTTP/1.1"
+
+    def forward(self):
+        port = self.server.ports.get(self.headers.get("Host", "").rsplit(":", 1)[0])
+        if port is None:
+            self.send_error(404, f"no dev server for {self.headers.get('Host')}")
+            return
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        headers = {k: v for k, v in self.headers.items() if k.lower() not in HOP_HEADERS}
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        try:
+            conn.request(self.command, self.path, body or None, headers)
+            resp = conn.getresponse()
+            data = resp.read()
+        except OSError as exc:
+            self.send_error(502, f"{type(exc).__name__}: {exc}")
+            return
+        finally:
+            conn.close()
+        self.send_response(resp.status, resp.reason)
+        for key, value in resp.getheaders():
+            if key.lower() not in HOP_HEADERS and key.lower() != "content-length":
+                self.send_header(key, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(data)
+
+    do_GET = do_HEAD = do_POST = do_PUT = do_PATCH = do_DELETE = do_OPTIONS = forward
+
+    def log_message(self, format, *args):
+        pass
+
+def run_dev(args: argparse.Namespace) -> None:
+    set_root(args.root)
+    everything, layout = load_layout(args)
+    ports, warnings = dev_ports(everything)
+    for line in warnings:
+        print(f"⚠️  {line}")
+    apps = [app for app in sorted(layout["routes"]) if (ROOT / "apps" / app / "package.json").is_file()]
+    if not apps:
+        raise SystemExit(f"❌ No apps to start under {ROOT} (generate first)")
+    width = max(len(app) for app in apps)
+    lock = threading.Lock()
+
+    def emit(app: str, line: str) -> None:
+        with lock:
+            print(f"{app:<{width}} │ {line.rstrip()}", flush=True)
+
+    def pump(app: str, stream) -> None:
+        for line in stream:
+            emit(app, line)
+
+    procs, ready, start = {}, {}, time.monotonic()
+
+    def launch(app: str) -> None:
+        # install if needed, start the server, then wait for it to answer
+        cwd = ROOT / "apps" / app
+        if needs_install(cwd):
+            emit(app, f"$ {shlex.join(NPM_INSTALL)}")
+            install = subprocess.run(NPM_INSTALL, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+            for line in install.stdout.splitlines()[-5:]:
+                emit(app, line)
+            if install.returncode:
+                emit(app, f"❌ npm install failed ({install.returncode})")
+                return
+        command = shlex.split(args.cmd.format(port=ports[app]))
+        proc = subprocess.Popen(
+            command, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+            start_new_session=True, env={**os.environ, "BROWSER": "none", "FORCE_COLOR": "0"},
+        )
+        procs[app] = proc
+        threading.Thread(target=pump, args=(app, proc.stdout), daemon=True).start()
+        if dev_ready(ports[app], proc, start + args.timeout):
+            ready[app] = time.monotonic() - start
+            emit(app, f"✅ ready on http://localhost:{ports[app]} after {ready[app]:.2f} s")
+        else:
+            emit(app, "❌ not ready" + (f" (exited with {proc.returncode})" if proc.poll() is not None else " (timed out)"))
+
+    for app in apps:
+        print(f"🚀 {app:<{width}} → http://localhost:{ports[app]}")
+    launchers = [threading.Thread(target=launch, args=(app,), daemon=True) for app in apps]
+    for thread in launchers:
+        thread.start()
+
+    proxy = None
+    try:
+        for thread in launchers:
+            thread.join()
+        cold = time.monotonic() - start
+        print(
+            f"⏱️  Cold start: {len(ready)}/{len(apps)} apps ready in {cold:.2f} s "
+            f"(slowest {max(ready.values(), default=0):.2f} s; per-app times add up to {sum(ready.values()):.2f} s)"
+        )
+        if args.proxy:
+            proxy = http.server.ThreadingHTTPServer(("127.0.0.1", args.proxy), DevProxyHandler)
+            proxy.daemon_threads = True
+            proxy.ports = {dev_hostname(layout["routes"][app]["host"]): ports[app] for app in ready}
+            threading.Thread(target=proxy.serve_forever, daemon=True).start()
+            for hostname, port in sorted(proxy.ports.items(), key=lambda item: item[1]):
+                print(f"🔀 http://{hostname}:{args.proxy} → :{port}")
+        if args.check:
+            raise SystemExit(0 if len(ready) == len(apps) else 1)
+        while any(proc.poll() is None for proc in procs.values()):
+            time.sleep(0.5)
+        print("💤 All dev servers exited")
+    except KeyboardInterrupt:
+        print("👋 Stopping dev servers")
+    finally:
+        if proxy:
+            proxy.shutdown()
+        for proc in procs.values():
+            if proc.poll() is None:
+                os.killpg(proc.pid, signal.SIGTERM)
+        for proc in procs.values():
+            try:
+                proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                os.killpg(proc.pid, signal.SIGKILL)
+
+# --------------------------
+# analyze (python 1.py analyze): chunk sizes, route cost, budgets, regressions
+# --------------------------
+def chunk_sizes(path: str) -> tuple:
+    # (raw, gzip -9, brotli q11 or None); runs in the process pool
+    data = Path(path).read_bytes()
+    return (
+        len(data),
+        len(gzip.compress(data, compresslevel=9, mtime=0)),
+        len(brotli.compress(data, quality=11)) if brotli else None,
+    )
+
+def manifest_closure(manifest: dict, key: str, files: set) -> None:
+    # every file a manifest entry loads up front: its chunk, static imports, css
+    entry = manifest.get(key)
+    if not entry or entry["file"] in files:
+        return
+    files.add(entry["file"])
+    files.update(entry.get("css", []))
+    for imported in entry.get("imports", []):
+        manifest_closure(manifest, imported, files)
+
+def route_files(app: str, app_routes: dict, manifest: dict) -> dict:
+    # route path -> files loaded to render it: the entry's closure plus the
+    # closures of the route's own sources that vite emitted as dynamic entries
+    prefix = f"apps/{app}/"
+    entry = next((key for key, e in manifest.items() if e.get("isEntry")), None)
+    initial = set()
+    if entry:
+        manifest_closure(manifest, entry, initial)
+    routes = {}
+    for path, sources, _ in app_routes["routes"]:
+        files = set(initial)
+        for rel in sources:
+            manifest_closure(manifest, rel.removeprefix(prefix), files)
+        routes[path] = files
+    return routes
+
+def scan_dist(app: str) -> dict:
+    # rel under dist -> stat, for the js/css vite emitted
+    dist = ROOT / "apps" / app / "dist"
+    files, _ = scan_tree(dist)
+    return {rel: st for rel, st in files.items() if rel.endswith((".js", ".mjs", ".css"))}
+
+def kb(nbytes) -> str:
+    return "—" if nbytes is None else f"{nbytes / 1000:.1f} kB"
+
+def check_bundles(report: dict, baseline: dict, tolerance: float) -> list:
+    # budget overruns, plus growth past tolerance against the baseline (1 kB
+    # floor, so a few bytes on a tiny chunk don't fail the run)
+    problems = []
+    for app, result in report.items():
+        budgets = result["budgets"]
+        for path, gz in result["routes"].items():
+            limit = budgets.get("initial_kb" if path == "/" else "route_kb") or budgets.get("route_kb")
+            if limit and gz > limit * 1000:
+                problems.append(f"apps/{app} {path}: {gz / 1000:.1f} kB gzip over its {limit} kB budget")
+            base = baseline.get(app, {}).get("routes", {}).get(path)
+            if base and gz > base * (1 + tolerance) and gz - base > 1000:
+                problems.append(f"apps/{app} {path}: {gz / 1000:.1f} kB gzip vs {base / 1000:.1f} kB baseline")
+        base = baseline.get(app, {}).get("total")
+        if base and result["total"] > base * (1 + tolerance) and result["total"] - base > 1000:
+            problems.append(f"apps/{app}: {result['total'] / 1000:.1f} kB gzip vs {base / 1000:.1f} kB baseline")
+    return problems
+
+def warn_without_brotli(consequence: str) -> None:
+    # brotli is an optional import; say so up front rather than skip it quietly
+    # (on stderr, so --report json stays parseable)
+    if brotli is None:
+        print(f"⚠️  brotli module not installed ({consequence}): pip install brotli", file=sys.stderr)
+
+def run_analyze(args: argparse.Namespace) -> None:
+    set_root(args.root)
+    warn_without_brotli("brotli sizes show as —")
+    _, layout = load_layout(args)
+    state_path = ROOT / BUNDLE_STATE_NAME
+    try:
+        state = json.loads(state_path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        state = {}
+    file_state, sizes, baseline = state.get("files", {}), state.get("sizes", {}), state.get("baseline", {})
+
+    # chunk hashes are reused while size and mtime match; sizes are keyed by hash
+    start = time.perf_counter()
+    apps = {app: scan_dist(app) for app in sorted(layout["routes"]) if (ROOT / "apps" / app / "dist").is_dir()}
+    if not apps:
+        raise SystemExit("❌ No apps/*/dist to analyze: run python 1.py build first.")
+    digests, rehash = {}, []
+    for app, files in apps.items():
+        for rel, st in files.items():
+            key = f"apps/{app}/dist/{rel}"
+            known = file_state.get(key)
+            if known and known["size"] == st.st_size and known["mtime_ns"] == st.st_mtime_ns:
+                digests[key] = known["sha256"]
+            else:
+                rehash.append(key)
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        for key, digest in zip(rehash, pool.map(lambda key: file_sha256(ROOT / key), rehash)):
+            st = (ROOT / key).stat()
+            digests[key] = digest
+            file_state[key] = {"sha256": digest, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    todo = {digest: key for key, digest in digests.items() if digest not in sizes or (brotli and sizes[digest][2] is None)}
+    if todo:
+        with ProcessPoolExecutor(max_workers=max(1, min(args.procs, len(todo)))) as pool:
+            for digest, result in zip(todo, pool.map(chunk_sizes, [str(ROOT / key) for key in todo.values()], chunksize=8)):
+                sizes[digest] = list(result)
+    elapsed = time.perf_counter() - start
+
+    report, chunks = {}, []
+    for app, files in apps.items():
+        try:
+            manifest = json.loads((ROOT / "apps" / app / "dist" / VITE_MANIFEST).read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            manifest = {}
+        routes = route_files(app, layout["routes"][app], manifest) if manifest else {}
+        gz = {rel: sizes[digests[f"apps/{app}/dist/{rel}"]][1] for rel in files}
+        for rel in files:
+            raw, gzipped, br = sizes[digests[f"apps/{app}/dist/{rel}"]]
+            used_by = sorted(path for path, loaded in routes.items() if rel in loaded)
+            previous = baseline.get(app, {}).get("chunks", {}).get(CHUNK_HASH.sub("", rel))
+            chunks.append({"app": app, "chunk": rel, "raw": raw, "gzip": gzipped, "brotli": br, "routes": used_by,
+                           "delta": gzipped - previous if previous is not None else None})
+        report[app] = {
+            "total": sum(gz.values()),
+            "raw": sum(sizes[digests[f"apps/{app}/dist/{rel}"]][0] for rel in files),
+            "routes": {path: sum(gz.get(rel, 0) for rel in loaded) for path, loaded in routes.items()},
+            "budgets": layout["routes"][app].get("budgets", {}),
+            "manifest": bool(manifest),
+        }
+
+    if args.save_baseline:
+        baseline = {
+            app: {
+                "total": result["total"],
+                "routes": result["routes"],
+                "chunks": {CHUNK_HASH.sub("", c["chunk"]): c["gzip"] for c in chunks if c["app"] == app},
+            }
+            for app, result in report.items()
+        }
+    live = set(digests.values())
+    tmp = ROOT / f"{BUNDLE_STATE_NAME}.tmp"
+    tmp.write_text(json.dumps({
+        "files": {key: e for key, e in file_state.items() if key in digests},
+        "sizes": {digest: v for digest, v in sizes.items() if digest in live},
+        "baseline": baseline,
+    }, indent=1, sort_keys=True) + "\n", encoding="utf-8")
+    os.replace(tmp, state_path)
+
+    problems = [] if args.save_baseline else check_bundles(report, baseline, args.tolerance)
+    chunks.sort(key=lambda c: -c["gzip"])
+    if args.report == "json":
+        json.dump({"seconds": elapsed, "rehashed": len(rehash), "compressed": len(todo), "apps": report,
+                   "top": chunks[:args.top], "problems": problems}, sys.stdout, indent=1)
+        print()
+        raise SystemExit(1 if problems else 0)
+
+    for app, result in report.items():
+        print(f"📦 apps/{app}: {len(apps[app])} chunks, {kb(result['raw'])} raw, {kb(result['total'])} gzip")
+        if not result["manifest"]:
+            print(f"   ⚠️  no dist/{VITE_MANIFEST}: set build.manifest so chunks map to routes")
+        for path, gz in sorted(result["routes"].items(), key=lambda item: -item[1])[:args.top]:
+            print(f"   {path:<36} {kb(gz):>10}")
+    print(f"\n🏋️  Top {min(args.top, len(chunks))} chunks by gzip size:")
+    print(f"  {'app':<8} {'chunk':<40} {'raw':>10} {'gzip':>10} {'brotli':>10} {'Δ gzip':>10}  routes")
+    for c in chunks[:args.top]:
+        delta = "new" if c["delta"] is None and baseline.get(c["app"]) else (f"{c['delta']:+d} B" if c["delta"] is not None else "")
+        print(
+            f"  {c['app']:<8} {c['chunk']:<40} {kb(c['raw']):>10} {kb(c['gzip']):>10} {kb(c['brotli']):>10} {delta:>10}"
+            f"  {len(c['routes'])}"
+        )
+    print(
+        f"⏱️  {sum(len(files) for files in apps.values())} chunks in {len(apps)} apps in {elapsed * 1e3:.0f} ms "
+        f"({len(rehash)} re-hashed, {len(todo)} compressed{'' if brotli else ', no brotli module'})"
+    )
+    if args.save_baseline:
+        print(f"💾 Baseline saved in {state_path}")
+        return
+    for line in problems:
+        print(f"❌ {line}")
+    if problems:
+        raise SystemExit(1)
+    print(f"✅ Within budgets and {args.tolerance:.0%} of baseline" if baseline else "✅ Within budgets (no baseline yet; record one with --save-baseline)")
+
+# --------------------------
+# compress (python 1.py compress): .gz/.br siblings for apps/*/public and dist
+# --------------------------
+def compress_file(path: str) -> dict:
+    # Runs in the process pool: writes path.gz (gzip -9) and path.br (brotli q11,
+    # when the module is there) if they pay off, removes siblings that don't
+    source = Path(path)
+    data = source.read_bytes()
+    st = source.stat()
+    result = {"raw": len(data), "gz": 0, "br": None}
+    payloads = {"gz": gzip.compress(data, compresslevel=9, mtime=ARCHIVE_EPOCH)}
+    if brotli:
+        payloads["br"] = brotli.compress(data, quality=11)
+    else:
+        Path(f"{path}.br").unlink(missing_ok=True)  # would be stale once the source changes
+    for suffix, payload in payloads.items():
+        target = Path(f"{path}.{suffix}")
+        if len(payload) > len(data) * COMPRESS_MIN_RATIO:
+            target.unlink(missing_ok=True)
+            result[suffix] = 0
+            continue
+        try:
+            same = target.read_bytes() == payload
+        except FileNotFoundError:
+            same = False
+        if not same:
+            tmp = target.with_name(f".{target.name}.tmp")
+            tmp.write_bytes(payload)
+            os.replace(tmp, target)
+        # siblings carry the source's mtime, as gzip_static/brotli_static expect
+        os.utime(target, ns=(st.st_atime_ns, st.st_mtime_ns))
+        result[suffix] = len(payload)
+    return result
+
+def compress_candidates(app: str) -> dict:
+    # rel under ROOT -> stat for everything in public/ and dist/ worth trying
+    found = {}
+    for sub in ("public", "dist"):
+        base = ROOT / "apps" / app / sub
+        if not base.is_dir():
+            continue
+        files, _ = scan_tree(base)
+        for rel, st in files.items():
+            name = rel.rsplit("/", 1)[-1]
+            if name.startswith(".") or Path(name).suffix.lower() in COMPRESSED_SUFFIXES:
+                continue
+            found[f"apps/{app}/{sub}/{rel}"] = st
+    return found
+
+def run_compress(args: argparse.Namespace) -> None:
+    set_root(args.root)
+    warn_without_brotli("only .gz siblings are written, no .br")
+    _, layout = load_layout(args)
+    state_path = ROOT / COMPRESS_STATE_NAME
+    try:
+        ledger = json.loads(state_path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        ledger = {}
+
+    start = time.perf_counter()
+    candidates = {}
+    for app in sorted(layout["routes"]):
+        candidates.update(compress_candidates(app))
+    small = {rel for rel, st in candidates.items() if st.st_size < COMPRESS_MIN_BYTES}
+
+    # unchanged: same size/mtime, or same sha256, as last time, with the recorded siblings still there
+    def unchanged(rel: str, digest: str) -> bool:
+        entry = ledger.get(rel)
+        return bool(entry) and entry["sha256"] == digest and (not brotli or entry["br"] is not None) and all(
+            Path(f"{ROOT / rel}.{suffix}").exists() for suffix in ("gz", "br") if entry.get(suffix)
+        )
+
+    digests, rehash = {}, []
+    for rel, st in candidates.items():
+        entry = ledger.get(rel)
+        if rel in small:
+            continue
+        if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+            digests[rel] = entry["sha256"]
+        else:
+            rehash.append(rel)
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        digests.update(zip(rehash, pool.map(lambda rel: file_sha256(ROOT / rel), rehash)))
+    todo = sorted(rel for rel, digest in digests.items() if not unchanged(rel, digest))
+
+    results = {}
+    if todo:
+        with ProcessPoolExecutor(max_workers=max(1, min(args.procs, len(todo)))) as pool:
+            results = dict(zip(todo, pool.map(compress_file, [str(ROOT / rel) for rel in todo], chunksize=4)))
+    for rel, result in results.items():
+        st = (ROOT / rel).stat()
+        ledger[rel] = {"sha256": digests[rel], "size": st.st_size, "mtime_ns": st.st_mtime_ns, **result}
+    for rel in digests.keys() - results.keys():
+        st = candidates[rel]
+        ledger[rel] = {**ledger[rel], "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+    # sources that are gone (or now too small) take their siblings with them
+    # (sitemap .gz files belong to the sitemaps phase)
+    removed = 0
+    for rel in set(ledger) - set(digests):
+        for suffix in ("gz", "br"):
+            if ledger[rel].get(suffix) and not SITEMAP_EXTRA.search(f"{rel}.{suffix}"):
+                Path(f"{ROOT / rel}.{suffix}").unlink(missing_ok=True)
+                removed += 1
+        del ledger[rel]
+    tmp = ROOT / f"{COMPRESS_STATE_NAME}.tmp"
+    tmp.write_text(json.dumps(ledger, indent=1, sort_keys=True) + "\n", encoding="utf-8")
+    os.replace(tmp, state_path)
+    elapsed = time.perf_counter() - start
+
+    kept = [e for rel, e in ledger.items() if e.get("gz") or e.get("br")]
+    summary = {
+        "files": len(candidates),
+        "compressed": len(results),
+        "unchanged": len(digests) - len(results),
+        "too_small": len(small),
+        "not_worth_it": sum(1 for e in ledger.values() if not e.get("gz") and not e.get("br")),
+        "gz": sum(1 for e in ledger.values() if e.get("gz")),
+        "br": sum(1 for e in ledger.values() if e.get("br")),
+        "removed": removed,
+        "raw_bytes": sum(e["raw"] for e in kept),
+        "gz_bytes": sum(e["gz"] or e["raw"] for e in kept),
+        "br_bytes": sum(e["br"] or e["raw"] for e in kept if brotli),
+        "seconds": elapsed,
+    }
+    if args.report == "json":
+        json.dump(summary, sys.stdout, indent=1)
+        print()
+        return
+    print(
+        f"🗜️  {summary['files']} files: {summary['compressed']} compressed, {summary['unchanged']} unchanged, "
+        f"{summary['not_worth_it']} not worth it, {summary['too_small']} under {COMPRESS_MIN_BYTES} B"
+        + (f", {removed} stale siblings removed" if removed else "")
+    )
+    print(
+        f"📉 {summary['gz']} .gz ({kb(summary['raw_bytes'])} → {kb(summary['gz_bytes'])})"
+        + (f", {summary['br']} .br (→ {kb(summary['br_bytes'])})" if brotli else ", no .br (brotli module not installed)")
+        + f" in {elapsed * 1e3:.0f} ms"
+    )
+
+# --------------------------
+# instrumentation
+# --------------------------
+# Filesystem calls seen through audit hooks (open, mkdir, rename, ...) plus
+# os.stat, which has no audit event and is wrapped while counting
+FS_AUDIT_EVENTS = frozenset({
+    "open", "os.mkdir", "os.rename", "os.remove", "os.rmdir", "os.scandir", "os.listdir", "os.link", "os.utime",
+})
+SYSCALLS = collections.Counter()
+_syscall_lock = threading.Lock()
+_counting_syscalls = False
+_audit_hook_installed = False
+
+# One record per phase of the current run, in order
+PHASES = []
+
+# Observers for dashboards/tools: phase_start(record), phase_end(record),
+# file(path, status, render_seconds, write_seconds, nbytes)
+HOOKS = {"phase_start": [], "phase_end": [], "file": []}
+
+# Per-run totals fed by note_dirs()/note_file(); reset by reset_run_stats()
+RUN_STATS = {}
+_run_stats_lock = threading.Lock()
+
+def reset_run_stats() -> None:
+    PHASES.clear()
+    RUN_STATS.update({
+        "dirs_created": 0,
+        "bytes_written": 0,
+        "render_seconds": 0.0,
+        "write_seconds": 0.0,
+        "files": collections.Counter(),
+        "timings": [],
+        "blobs": set(),
+        "sitemap_urls": 0,
+        "sitemaps_written": 0,
+    })
+
+def add_hook(event: str, callback) -> None:
+    HOOKS[event].append(callback)
+
+def note_dirs(created: int) -> None:
+    if created and RUN_STATS:
+        with _run_stats_lock:
+            RUN_STATS["dirs_created"] += created
+
+def note_blob(digest: str) -> None:
+    if RUN_STATS:
+        with _run_stats_lock:
+            RUN_STATS["blobs"].add(digest)
+
+def note_file(rel_path: str, status: str, render_seconds: float, write_seconds: float, nbytes: int) -> None:
+    if RUN_STATS:
+        with _run_stats_lock:
+            RUN_STATS["files"][status] += 1
+            RUN_STATS["bytes_written"] += nbytes
+            RUN_STATS["render_seconds"] += render_seconds
+            RUN_STATS["write_seconds"] += write_seconds
+            RUN_STATS["timings"].append((render_seconds + write_seconds, rel_path, status, nbytes))
+    for callback in HOOKS["file"]:
+        callback(rel_path, status, render_seconds, write_seconds, nbytes)
+
+def _count_fs_event(event: str, args) -> None:
+    if _counting_syscalls and event in FS_AUDIT_EVENTS:
+        with _syscall_lock:
+            SYSCALLS[event] += 1
+
+@contextmanager
+def count_syscalls():
+    global _counting_syscalls, _audit_hook_installed
+    if not _audit_hook_installed:
+        sys.addaudithook(_count_fs_event)
+        _audit_hook_installed = True
+    real_stat = os.stat
+
+    def counted_stat(*args, **kwargs):
+        with _syscall_lock:
+            SYSCALLS["os.stat"] += 1
+        return real_stat(*args, **kwargs)
+
+    os.stat = counted_stat
+    _counting_syscalls = True
+    try:
+        yield SYSCALLS
+    finally:
+        _counting_syscalls = False
+        os.stat = real_stat
+
+def peak_rss_kb() -> int:
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+@functools.lru_cache(maxsize=None)
+def proc_fds(pid: int):
+    # Opened once per process (forked tenant workers must not read the
+    # parent's) and re-read with pread, so sampling adds no counted opens;
+    # None where /proc can't reset the high-water mark (non-Linux)
+    try:
+        return os.open(f"/proc/{pid}/status", os.O_RDONLY), os.open(f"/proc/{pid}/clear_refs", os.O_WRONLY)
+    except OSError:
+        return None
+
+def sample_rss_peak() -> int:
+    # VmHWM since the last reset_rss_peak(); without /proc this is ru_maxrss,
+    # the process-wide high-water mark, which only ever climbs
+    fds = proc_fds(os.getpid())
+    if fds is None:
+        return peak_rss_kb()
+    match = re.search(rb"VmHWM:\s+(\d+)", os.pread(fds[0], 4096, 0))
+    return int(match.group(1)) if match else peak_rss_kb()
+
+def reset_rss_peak() -> None:
+    fds = proc_fds(os.getpid())
+    if fds is not None:
+        try:
+            os.pwrite(fds[1], b"5", 0)
+        except OSError:
+            pass
+
+# Phases still running; nested phases reset the high-water mark, so the
+# outer ones take the peak seen so far before every reset
+OPEN_PHASES = []
+
+def fold_rss_peak() -> None:
+    peak = sample_rss_peak()
+    for record in OPEN_PHASES:
+        record["peak_rss_kb"] = max(record["peak_rss_kb"], peak)
+
+@contextmanager
+def phase(name: str):
+    # Records wall time, counted syscalls and the phase's own RSS peak; callers
+    # may add fields (e.g. "files") to the yielded record
+    record = {"name": name, "files": 0, "peak_rss_kb": 0}
+    for callback in HOOKS["phase_start"]:
+        callback(record)
+    fold_rss_peak()
+    reset_rss_peak()
+    OPEN_PHASES.append(record)
+    calls = sum(SYSCALLS.values())
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["seconds"] = time.perf_counter() - start
+        record["syscalls"] = sum(SYSCALLS.values()) - calls
+        fold_rss_peak()
+        OPEN_PHASES.remove(record)
+        PHASES.append(record)
+        for callback in HOOKS["phase_end"]:
+            callback(record)
+
+def run_report(args: argparse.Namespace, slowest: int) -> dict:
+    timings = sorted(RUN_STATS["timings"], reverse=True)[:slowest]
+    return {
+        "root": str(ROOT.resolve()),
+        "spec": str(args.spec),
+        "selection": {"only": args.only, "glob": args.glob},
+        "mode": {
+            "incremental": args.incremental,
+            "staged": args.staged,
+            "workers": args.workers,
+            "fsync": args.fsync if args.staged else None,
+            "link_mode": args.link_mode,
+        },
+        "phases": [
+            {k: record[k] for k in ("name", "seconds", "files", "syscalls", "peak_rss_kb")}
+            for record in PHASES
+        ],
+        "files": dict(RUN_STATS["files"]),
+        "dirs_created": RUN_STATS["dirs_created"],
+        "unique_blobs": len(RUN_STATS["blobs"]),
+        "sitemap_urls": RUN_STATS["sitemap_urls"],
+        "bytes_written": RUN_STATS["bytes_written"],
+        # summed over worker threads, so they can exceed the write phase's wall time
+        "render_seconds": RUN_STATS["render_seconds"],
+        "write_seconds": RUN_STATS["write_seconds"],
+        "syscalls": dict(SYSCALLS),
+        "slowest": [
+            {"path": rel, "seconds": seconds, "status": status, "bytes": nbytes}
+            for seconds, rel, status, nbytes in timings
+        ],
+    }
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate the tryatlabs monorepo skeleton.")
+    parser.add_argument(
+        "--root",
+        type=Path,
+        default=ROOT,
+        help=f"output directory (default: {ROOT})",
+    )
+    parser.add_argument(
+        "--spec",
+        type=Path,
+        default=SPEC_PATH,
+        help=f"layout spec to generate from (default: {SPEC_PATH.name})",
+    )
+    parser.add_argument(
+        "--tenants",
+        type=Path,
+        metavar="FILE",
+        help="JSON object of tenant name -> overrides (domain, brand, tagline, apps); "
+             "each tenant is generated under ROOT/<name> in a process pool",
+    )
+    parser.add_argument(
+        "--tenant-procs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="worker processes for --tenants (default: CPU count)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="re-parse and re-validate the spec instead of using the compiled cache",
+    )
+    parser.add_argument(
+        "--only",
+        action="append",
+        default=[],
+        metavar="PREFIX",
+        help="only generate paths under PREFIX, e.g. apps/pdf (repeatable)",
+    )
+    parser.add_argument(
+        "--glob",
+        action="append",
+        default=[],
+        metavar="PATTERN",
+        help="only generate paths matching PATTERN, e.g. 'apps/*/vite.config.js' (repeatable)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=f"skip files whose content matches {MANIFEST_NAME} and whose size/mtime are unchanged",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"parallel file writers (default: {DEFAULT_WORKERS}); 1 uses the serial path",
+    )
+    parser.add_argument(
+        "--staged",
+        action="store_true",
+        help=f"render into {STAGING_DIR} and swap into ROOT with renames (all-or-nothing)",
+    )
+    parser.add_argument(
+        "--fsync",
+        choices=["batch", "none"],
+        default="batch",
+        help="with --staged: fsync the whole stage once before swapping (batch) or not at all (none)",
+    )
+    parser.add_argument(
+        "--link-mode",
+        choices=["copy", "hardlink", "reflink"],
+        default="copy",
+        help="how files with identical content are materialized: separate copies (default), hardlinks or "
+             "reflinks to one blob in the content store next to ROOT (reflink falls back to copy)",
+    )
+    parser.add_argument(
+        "--archive",
+        metavar="FILE",
+        help="stream the tree into a tar/tar.gz/zip archive (format from the suffix, '-' for stdout) "
+             "instead of writing under ROOT; entries are sorted with fixed timestamps "
+             "(SOURCE_DATE_EPOCH) so archives are reproducible",
+    )
+    parser.add_argument(
+        "--archive-format",
+        choices=["tar", "tgz", "zip"],
+        help="archive format when the suffix doesn't say (default: tar)",
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="render in memory and report what would change under ROOT without writing; exits 1 on changes",
+    )
+    parser.add_argument(
+        "--diff",
+        action="store_true",
+        help="with --plan, print a unified diff for every modified file",
+    )
+    parser.add_argument(
+        "--template-stats",
+        action="store_true",
+        help="print per-template render counts and timings after the run",
+    )
+    parser.add_argument(
+        "--report",
+        choices=["text", "json"],
+        default="text",
+        help="json: print a machine-readable run report (phases, bytes, syscalls, slowest files) instead of the summary",
+    )
+    parser.add_argument(
+        "--slowest",
+        type=int,
+        default=10,
+        metavar="N",
+        help="files listed in the json report's slowest section (default: 10)",
+    )
+    parser.add_argument(
+        "--dir-plan",
+        action="store_true",
+        help="print the directory plan (counts, syscall estimate, collisions) and exit",
+    )
+
+    commands = parser.add_subparsers(dest="command")
+    bench = commands.add_parser("bench", help="benchmark the generator on a synthetic spec in tmpfs")
+    bench.add_argument("--apps", type=int, default=6, help="synthetic apps (default: 6)")
+    bench.add_argument("--tools", type=int, default=100, help="tool pages per app (default: 100)")
+    bench.add_argument("--pages", type=int, default=10, help="static pages per app (default: 10)")
+    bench.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help=f"write workers (default: {DEFAULT_WORKERS})")
+    bench.add_argument("--repeat", type=int, default=3, help="runs per phase, best one is kept (default: 3)")
+    bench.add_argument("--baseline", type=Path, default=BENCH_BASELINES, help=f"baseline file (default: {BENCH_BASELINES})")
+    bench.add_argument("--save-baseline", action="store_true", help="record this run as the baseline for its scale")
+    bench.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before failing (default: 0.25)")
+    commands.add_parser(
+        "verify",
+        help="report drifted, missing and orphaned files under --root using a Merkle tree "
+             f"(skips {', '.join(sorted(VERIFY_SKIP_DIRS))}; exit 1 on drift)",
+    )
+    commands.add_parser(
+        "prerender",
+        help="after `vite build`, write one HTML file per route into apps/*/dist with the SEO head baked in; "
+             "static pages also get their markup inlined until React renders them in the app layout "
+             "(--root/--spec/--only/--glob/--workers apply)",
+    )
+    build = commands.add_parser(
+        "build",
+        help="run each app's and package's build script (packages first, independent ones in parallel), "
+             f"skipping nodes whose inputs hash as in {BUILD_STATE_NAME}",
+    )
+    build.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="concurrent builds (default: CPU count)")
+    build.add_argument("--cmd", default="npm run build", help="build command run in each node (default: npm run build)")
+    build.add_argument("--force", action="store_true", help="rebuild even when the inputs are unchanged")
+    dev = commands.add_parser(
+        "dev",
+        help="start every app's dev server at once on the ports from apps/main/.env (MAIN_ENV), "
+             "wait until each answers, and multiplex their logs",
+    )
+    dev.add_argument(
+        "--cmd",
+        default="npm run dev -- --port {port} --strictPort",
+        help="dev server command run in each app, {port} is substituted (default: %(default)s)",
+    )
+    dev.add_argument("--proxy", type=int, metavar="PORT", help="also serve every app on PORT as <app>.localhost (main on localhost)")
+    dev.add_argument("--timeout", type=float, default=60.0, help="seconds to wait for the servers to answer (default: 60)")
+    dev.add_argument("--check", action="store_true", help="stop once all apps are ready (or not); exit 1 if any failed")
+    analyze = commands.add_parser(
+        "analyze",
+        help="raw/gzip/brotli sizes of every chunk in apps/*/dist, what each route loads, spec budgets "
+             f"and regressions against the baseline in {BUNDLE_STATE_NAME} (exit 1 on either)",
+    )
+    analyze.add_argument("--top", type=int, default=10, metavar="N", help="chunks and routes listed (default: 10)")
+    analyze.add_argument("--procs", type=int, default=os.cpu_count() or 1, help="compression processes (default: CPU count)")
+    analyze.add_argument("--tolerance", type=float, default=0.05, help="allowed growth over the baseline (default: 0.05)")
+    analyze.add_argument("--save-baseline", action="store_true", help="record these sizes as the baseline")
+    compress = commands.add_parser(
+        "compress",
+        help="write .gz (level 9) and .br (quality 11, needs the brotli module) siblings for apps/*/public "
+             f"and apps/*/dist, skipping files unchanged since the last run ({COMPRESS_STATE_NAME}) "
+             "and files that don't shrink by 10%%",
+    )
+    compress.add_argument("--procs", type=int, default=os.cpu_count() or 1, help="compression processes (default: CPU count)")
+    commands.add_parser(
+        "watch",
+        help="regenerate on changes to the spec or templates, writing only the affected files "
+             "(--root/--spec/--only/--glob/--link-mode apply; --slowest caps the listed files)",
+    )
+    args = parser.parse_args(argv)
+    # every tenant is a full write into ROOT/<name>; the modes that only report or
+    # stream elsewhere aren't carried into the tenant runs
+    if args.tenants:
+        clashes = [flag for flag, on in (("--plan", args.plan), ("--archive", args.archive), ("--dir-plan", args.dir_plan)) if on]
+        if clashes:
+            parser.error(f"--tenants can't be combined with {', '.join(clashes)}")
+    return args
+
+def load_layout(args: argparse.Namespace) -> tuple:
+    everything = full_layout(args.spec, not args.no_cache)
+    return everything, select_layout(everything, args.only, args.glob)
+
+def generate(args: argparse.Namespace, everything: dict, layout: dict, plan: dict) -> dict:
+    with phase("write") as record:
+        recover_staging(args.fsync)
+        manifest = load_manifest()
+        staged = []
+        if args.staged:
+            counts, new_manifest, staged = write_staged(
+                layout, manifest, args.incremental, args.workers, plan, args.fsync, args.link_mode
+            )
+        elif args.workers > 1:
+            counts, new_manifest = write_parallel(layout, manifest, args.incremental, args.workers, plan, args.link_mode)
+        else:
+            counts, new_manifest = write_serial(layout, manifest, args.incremental, args.link_mode)
+        record["files"] = sum(counts.values())
+    # --staged: the manifest, sitemaps and ledger are staged too and swapped in
+    # with the files, so a crash leaves either all of them or none
+    stage = STAGING_DIR if args.staged else None
+    if stage:
+        os.makedirs(stage, exist_ok=True)
+    removed = []
+    with phase("manifest") as record:
+        # Entries for files outside the selection are kept as they were
+        kept = {rel: e for rel, e in manifest.items() if rel in everything["content"] and rel not in layout["content"]}
+        # a no-op run leaves the manifest's mtime alone too
+        record["files"] = int({**kept, **new_manifest} != manifest)
+        if record["files"]:
+            save_manifest({**kept, **new_manifest}, stage)
+            if stage:
+                staged.append(MANIFEST_NAME)
+    if layout.get("routes"):
+        with phase("sitemaps") as record:
+            digest = source_digests(everything["content"], everything["seeds"], new_manifest)
+            result = write_sitemaps(layout["routes"], digest, stage)
+            staged += result["staged"]
+            removed = result["removed"]
+            RUN_STATS["sitemap_urls"] = result["urls"]
+            RUN_STATS["sitemaps_written"] = result["written"]
+            record["files"] = result["written"]
+    if stage:
+        with phase("swap") as record:
+            record["files"] = len(swap_staging(staged, removed, args.fsync))
+    return counts
+
+# --------------------------
+# tenants (--tenants FILE)
+# --------------------------
+def tenant_spec(spec: dict, overrides: dict) -> dict:
+    # Site vars are replaced; app hosts move from the base domain to the tenant's
+    site = spec.get("site", {})
+    base = site.get("domain", "")
+    domain = overrides.get("domain", base)
+    enabled = overrides.get("apps", list(spec.get("apps", {})))
+    # redirects to a disabled app's URLS key go with it (hub_variables drops the key)
+    disabled = {name.upper() for name in spec.get("apps", {}) if name not in enabled}
+    apps = {}
+    for name in enabled:
+        app = spec.get("apps", {})[name]
+        host = app.get("host", "")
+        if host == base:
+            host = domain
+        elif host.endswith(f".{base}"):
+            host = host[: -len(base)] + domain
+        apps[name] = {**app, "host": host}
+        if isinstance(app.get("redirects"), dict):
+            apps[name]["redirects"] = {src: to for src, to in app["redirects"].items() if to not in disabled}
+    return {**spec, "site": {**site, **{k: v for k, v in overrides.items() if k in SITE_VARS}}, "apps": apps}
+
+def load_tenants(path: Path, spec: dict) -> dict:
+    # {"acme": {"domain": "acme.dev", "brand": "Acme", "apps": ["main", "tools"]}, ...}
+    try:
+        tenants = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as exc:
+        raise SystemExit(f"❌ {path}: {exc}")
+    problems = []
+    if not isinstance(tenants, dict) or not tenants:
+        problems.append("expected a non-empty object of tenant name -> overrides")
+        tenants = {}
+    for name, overrides in tenants.items():
+        if not re.fullmatch(r"[A-Za-z0-9][A-Za-z0-9._-]*", name):
+            problems.append(f"{name!r}: tenant names are used as directory names")
+        if not isinstance(overrides, dict):
+            problems.append(f"{name}: overrides must be an object")
+            continue
+        unknown = set(overrides) - {*SITE_VARS, "apps"}
+        if unknown:
+            problems.append(f"{name}: unknown keys {sorted(unknown)}")
+        missing = set(overrides.get("apps", [])) - set(spec.get("apps", {}))
+        if missing:
+            problems.append(f"{name}: unknown apps {sorted(missing)}")
+        if not problems:
+            problems.extend(f"{name}: {p}" for p in compile_spec(tenant_spec(spec, overrides))[1])
+    if problems:
+        raise SystemExit("\n".join([f"❌ {path}:", *(f"  - {p}" for p in problems)]))
+    return tenants
+
+def generate_tenant(args: argparse.Namespace, name: str, spec: dict) -> dict:
+    # Runs in a worker process; only this small summary goes back to the parent
+    global CAS_DIR
+    start = time.perf_counter()
+    set_root(args.root / name)
+    CAS_DIR = args.root / ".cas"  # hardlink/reflink blobs are shared by every tenant
+    reset_run_stats()
+    with phase("spec") as record:
+        everything = layout_from_compiled(compile_spec(spec)[0], shared_renders=True)
+        layout = select_layout(everything, args.only, args.glob)
+        record["files"] = len(layout["files"])
+    with phase("plan") as record:
+        plan = plan_dirs(layout)
+        record["files"] = plan["dirs"]
+    if plan["conflicts"]:
+        raise SystemExit(f"❌ {name}: paths used as both file and directory")
+    counts = generate(args, everything, layout, plan)
+    return {
+        "tenant": name,
+        "root": str(ROOT),
+        "seconds": time.perf_counter() - start,
+        **counts,
+        "dirs_created": RUN_STATS["dirs_created"],
+        "unique_blobs": len(RUN_STATS["blobs"]),
+        "phases": {record["name"]: record["seconds"] for record in PHASES},
+        "peak_rss_kb": max(record["peak_rss_kb"] for record in PHASES),
+        "pid": os.getpid(),
+    }
+
+def run_tenants(args: argparse.Namespace) -> None:
+    try:
+        spec = json.loads(args.spec.read_bytes())
+    except (OSError, ValueError) as exc:
+        raise SystemExit(f"❌ {args.spec}: {exc}")
+    tenants = load_tenants(args.tenants, spec)
+    procs = min(args.tenant_procs, len(tenants))
+    start = time.perf_counter()
+    results = []
+    # Layouts live only inside generate_tenant; the parent keeps just the summaries
+    with ProcessPoolExecutor(max_workers=procs) as pool:
+        futures = [
+            pool.submit(generate_tenant, args, name, tenant_spec(spec, overrides))
+            for name, overrides in tenants.items()
+        ]
+        for future in as_completed(futures):
+            results.append(future.result())
+    results.sort(key=lambda r: r["tenant"])
+    elapsed = time.perf_counter() - start
+
+    if args.report == "json":
+        json.dump({"seconds": elapsed, "processes": procs, "tenants": results}, sys.stdout, indent=1)
+        print()
+        return
+    print(f"🏢 {len(results)} tenants under {args.root.resolve()} in {elapsed:.2f} s ({procs} processes)")
+    print(f"  {'tenant':<20} {'ms':>8} {'written':>8} {'unchanged':>9} {'blobs':>6} {'peak RSS':>10}")
+    for r in results:
+        print(
+            f"  {r['tenant']:<20} {r['seconds'] * 1e3:>8.1f} {r['written']:>8} {r['unchanged']:>9}"
+            f" {r['unique_blobs']:>6} {r['peak_rss_kb'] / 1024:>8.1f}MB"
+        )
+
+# --------------------------
+# benchmark (python 1.py bench)
+# --------------------------
+def synthetic_spec(apps: int, tools: int, pages: int) -> dict:
+    # N apps x M tools x K static pages, built from the real templates
+    spec = {
+        "version": SPEC_FORMAT,
+        "site": {"domain": "bench.test", "brand": "Bench", "tagline": "Synthetic scale test."},
+        "dirs": ["configs", "scripts", "docs"],
+        "files": {"README.md": {"text": "# bench\n"}, "package.json": None},
+        "packages": {"core-utils": {"dirs": ["src/registry", "src/strings"]}},
+        "apps": {},
+    }
+    for a in range(apps):
+        name = f"app{a:03d}"
+        files = {
+            "index.html": {"template": "MAIN_INDEX_HTML"},
+            "vite.config.js": {"template": "VITE_CONFIG"},
+            "package.json": {"template": "MAIN_PKG"},
+            "public/robots.txt": None,
+            "src/app/App.jsx": {"template": "APP_TEMPLATE"},
+            "src/app/main.jsx": {"template": "MAIN_TEMPLATE"},
+            "src/app/site.config.js": {"template": "SITE_CONFIG_TEMPLATE"},
+            "src/routes/router.jsx": {"template": "ROUTER_SLUG_TEMPLATE"},
+            "src/pages/Home.jsx": {"template": "HOME_TEMPLATE"},
+            "src/pages/ToolPage.jsx": {"template": "TOOLPAGE_TEMPLATE"},
+            "src/pages/NotFound.jsx": {"template": "NOTFOUND_TEMPLATE"},
+            "src/seo/SeoHead.jsx": {"template": "SEO_HEAD_TEMPLATE"},
+        }
+        for t in range(tools):
+            files[f"src/tools/tool-{t:04d}/Tool.jsx"] = {
+                "template": "TOOLS_STATIC",
+                "vars": {"title": f"Tool {t} — {name}", "path": f"/tool-{t:04d}"},
+            }
+        for k in range(pages):
+            files[f"src/pages/Page{k:04d}.jsx"] = {
+                "template": "PLACEHOLDER_PAGE",
+                "vars": {"title": f"Page {k} — {name}", "path": f"/page-{k:04d}"},
+            }
+        spec["apps"][name] = {
+            "package": f"@bench/{name}",
+            "host": f"{name}.bench.test",
+            "tools": [f"tool-{t:04d}" for t in range(tools)],
+            "dirs": ["public", "src/app", "src/routes", "src/pages", "src/seo", "src/styles"],
+            "files": files,
+        }
+    return spec
+
+def bench_scratch_dir() -> str:
+    # tmpfs when available, so the numbers measure the generator, not the disk
+    shm = Path("/dev/shm")
+    return tempfile.mkdtemp(prefix="tryatlabs-bench-", dir=shm if shm.is_dir() and os.access(shm, os.W_OK) else None)
+
+def bench_once(args: argparse.Namespace) -> list:
+    scratch = Path(bench_scratch_dir())
+    try:
+        spec_path = scratch / "bench.spec.json"
+        spec_path.write_text(json.dumps(synthetic_spec(args.apps, args.tools, args.pages)), encoding="utf-8")
+        gen_args = parse_args(["--spec", str(spec_path), "--no-cache", "--workers", str(args.workers)])
+        set_root(scratch / "tryatlabs")
+        reset_run_stats()
+        with count_syscalls():
+            with phase("spec") as record:
+                everything, layout = load_layout(gen_args)
+                record["files"] = len(layout["files"])
+            with phase("plan") as record:
+                plan = plan_dirs(layout)
+                record["files"] = plan["dirs"]
+            generate(gen_args, everything, layout, plan)
+            results = list(PHASES)
+            # a no-op regeneration is the common case in CI and watch loops
+            gen_args.incremental = True
+            with phase("incremental") as record:
+                counts = generate(gen_args, everything, layout, plan)
+                record["files"] = sum(counts.values())
+        return [*results, PHASES[-1]]
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+def check_bench(results: list, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    for record in results:
+        base = baseline.get(record["name"])
+        if not base:
+            continue
+        # 5 ms floor so timer noise on tiny phases doesn't fail the run
+        if record["seconds"] > base["seconds"] * (1 + tolerance) and record["seconds"] - base["seconds"] > 0.005:
+            regressions.append(f"{record['name']}: {record['seconds'] * 1e3:.1f} ms vs {base['seconds'] * 1e3:.1f} ms")
+        if record["syscalls"] > base["syscalls"] * (1 + tolerance):
+            regressions.append(f"{record['name']}: {record['syscalls']} syscalls vs {base['syscalls']}")
+        if record["peak_rss_kb"] > base["peak_rss_kb"] * (1 + tolerance):
+            regressions.append(f"{record['name']}: peak RSS {record['peak_rss_kb']} KB vs {base['peak_rss_kb']} KB")
+    return regressions
+
+def run_bench(args: argparse.Namespace) -> None:
+    scale = f"{args.apps}x{args.tools}x{args.pages}"
+    # best of N per phase; syscalls and RSS are stable enough to take from the same run
+    best = {}
+    for _ in range(args.repeat):
+        for record in bench_once(args):
+            if record["name"] not in best or record["seconds"] < best[record["name"]]["seconds"]:
+                best[record["name"]] = record
+    results = list(best.values())
+
+    print(f"⏱️  Benchmark {scale} (apps x tools x pages), workers={args.workers}, best of {args.repeat}")
+    print(f"  {'phase':<12} {'ms':>9} {'files/s':>10} {'syscalls':>9} {'peak RSS':>10}")
+    for r in results:
+        rate = r["files"] / r["seconds"] if r["seconds"] else 0
+        print(f"  {r['name']:<12} {r['seconds'] * 1e3:>9.1f} {rate:>10.0f} {r['syscalls']:>9} {r['peak_rss_kb'] / 1024:>8.1f}MB")
+
+    try:
+        baselines = json.loads(args.baseline.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        baselines = {}
+    if args.save_baseline:
+        baselines[scale] = {r["name"]: {k: r[k] for k in ("seconds", "syscalls", "peak_rss_kb")} for r in results}
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(baselines, indent=1) + "\n", encoding="utf-8")
+        print(f"💾 Baseline saved for {scale} in {args.baseline}")
+        return
+    if scale not in baselines:
+        print(f"ℹ️  No baseline for {scale} yet; record one with --save-baseline")
+        return
+    regressions = check_bench(results, baselines[scale], args.tolerance)
+    for line in regressions:
+        print(f"❌ regression: {line}")
+    if regressions:
+        raise SystemExit(1)
+    print(f"✅ Within {args.tolerance:.0%} of baseline")
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    if args.command == "bench":
+        run_bench(args)
+        return
+    if args.command == "verify":
+        run_verify(args)
+        return
+    if args.command == "watch":
+        run_watch(args)
+        return
+    if args.command == "prerender":
+        run_prerender(args)
+        return
+    if args.command == "build":
+        run_build(args)
+        return
+    if args.command == "dev":
+        run_dev(args)
+        return
+    if args.command == "analyze":
+        run_analyze(args)
+        return
+    if args.command == "compress":
+        run_compress(args)
+        return
+
+    if args.tenants:
+        run_tenants(args)
+        return
+
+    set_root(args.root)
+    reset_run_stats()
+    with ExitStack() as stack:
+        if args.report == "json":
+            stack.enter_context(count_syscalls())
+        run(args)
+
+def write_archive_output(args: argparse.Namespace, layout: dict) -> None:
+    fmt = archive_format(args.archive, args.archive_format)
+    # the archive may own stdout, so messages go to stderr then
+    out = sys.stderr if args.archive == "-" else sys.stdout
+    with phase("write") as record:
+        if args.archive == "-":
+            counts = write_archive(layout, open_output(fmt, sys.stdout.buffer))
+            sys.stdout.buffer.flush()
+        else:
+            with open(args.archive, "wb") as fileobj:
+                counts = write_archive(layout, open_output(fmt, fileobj))
+        record["files"] = counts["files"]
+    if args.report == "json":
+        json.dump(run_report(args, args.slowest), out, indent=1)
+        print(file=out)
+        return
+    target = "stdout" if args.archive == "-" else args.archive
+    print(f"📦 {counts['files']} files + {counts['dirs']} dirs → {target} ({fmt}, {counts['bytes']} bytes)", file=out)
+
+def run(args: argparse.Namespace) -> None:
+    with phase("spec") as record:
+        everything, layout = load_layout(args)
+        record["files"] = len(layout["files"])
+    with phase("plan") as record:
+        plan = plan_dirs(layout)
+        record["files"] = plan["dirs"]
+    if args.dir_plan:
+        print_dir_plan(plan)
+        raise SystemExit(1 if plan["conflicts"] else 0)
+    if plan["conflicts"]:
+        print_dir_plan(plan)
+        raise SystemExit("❌ Paths used as both file and directory; fix the spec first.")
+    for problem in plan["collisions"]:
+        print(f"⚠️  {problem}")
+
+    if args.plan:
+        with phase("verify") as record:
+            planned = with_sitemaps(layout, everything["content"])
+            changes = plan_changes(planned, load_manifest(), args.workers)
+            record["files"] = sum(len(paths) for paths in changes.values())
+        print_plan(planned, changes, args.diff)
+        raise SystemExit(1 if changes["created"] or changes["modified"] else 0)
+
+    if args.archive:
+        write_archive_output(args, with_sitemaps(layout, everything["content"], gz=True))
+        return
+
+    counts = generate(args, everything, layout, plan)
+    if args.report == "json":
+        json.dump(run_report(args, args.slowest), sys.stdout, indent=1)
+        print()
+        return
 
     print(f"✅ Created + populated structure under: {ROOT.resolve()}")
-    print(f"📁 Dirs created: {len(DIRS)}")
-    print(f"📄 Files created: {len(FILES)}")
+    print(f"📁 Dirs created: {RUN_STATS['dirs_created']}")
+    print(f"📄 Files created: {counts['written']}")
+    print(f"✍️  Written: {counts['written']} | ⏭️  Skipped: {counts['skipped']} | 💤 Unchanged: {counts['unchanged']}")
+    print(f"🧬 Unique blobs: {len(RUN_STATS['blobs'])} for {len(layout['content'])} rendered files ({args.link_mode})")
+    if RUN_STATS["sitemap_urls"]:
+        print(f"🗺️  Sitemaps: {RUN_STATS['sitemap_urls']} URLs, {RUN_STATS['sitemaps_written']} files written (+ .gz)")
     print("✅ Important files populated with working routing + redirect logic (main + tools).")
     print("\nNext steps:")
     print("1) cd tryatlabs/apps/main && npm i && npm run dev")
     print("2) cd tryatlabs/apps/tools && npm i && npm run dev -- --port 5174")
     print("3) open http://localhost:5173 and click Tools (will redirect to localhost:5174 via apps/main/.env)")
+    print("4) python 1.py build   (every app's vite build: packages first, in parallel, cached by input hash)")
+    print("5) python 1.py dev     (all dev servers at once on the .env ports; --proxy 8080 for *.localhost)")
+    if args.template_stats:
+        print()
+        print_template_stats()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,31 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+SCRIPT = Path(__file__).resolve().parent.parent / "1.py"
+
+
+@pytest.fixture(scope="session")
+def gen():
+    # 1.py isn't an importable module name, so load it from its path
+    spec = importlib.util.spec_from_file_location("tryatlabs_gen", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def root(gen, tmp_path, monkeypatch):
+    # A fresh ROOT per test; sitemap lastmods pinned to SOURCE_DATE_EPOCH
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", str(gen.ARCHIVE_EPOCH))
+    previous = gen.ROOT
+    gen.set_root(tmp_path / "tryatlabs")
+    gen.reset_run_stats()
+    yield gen.ROOT
+    gen.set_root(previous)
+
+
+@pytest.fixture(scope="session")
+def layout(gen):
+    return gen.full_layout(use_cache=False)
@@ -0,0 +1,80 @@
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+FORMATS = ["tar", "tgz", "zip"]
+
+
+def archive_bytes(gen, layout, fmt):
+    buf = io.BytesIO()
+    gen.write_archive(layout, gen.open_output(fmt, buf))
+    return buf.getvalue()
+
+
+def read_archive(data, fmt):
+    # ({name: bytes}, {dir names}) in MemoryOutput's shape
+    files, dirs = {}, set()
+    if fmt == "zip":
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    dirs.add(info.filename.rstrip("/"))
+                else:
+                    files[info.filename] = archive.read(info)
+        return files, dirs
+    with tarfile.open(fileobj=io.BytesIO(data), mode="r:*") as archive:
+        for member in archive:
+            if member.isdir():
+                dirs.add(member.name)
+            else:
+                files[member.name] = archive.extractfile(member).read()
+    return files, dirs
+
+
+def test_open_output_memory(gen):
+    assert isinstance(gen.open_output("memory", None), gen.MemoryOutput)
+
+
+def test_memory_output_holds_the_rendered_tree(gen, root, layout):
+    out = gen.MemoryOutput()
+    counts = gen.write_archive(layout, out)
+
+    assert counts == {"dirs": len(out.dirs), "files": len(out.files), "bytes": sum(map(len, out.files.values()))}
+    for rel, render in layout["content"].items():
+        assert out.files[f"{root.name}/{rel}"] == render().encode("utf-8")
+    for rel in gen.placeholder_files(layout):
+        assert out.files[f"{root.name}/{rel}"] == b""
+    for name in out.files:
+        assert name.rpartition("/")[0] in out.dirs
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_archive_round_trips_to_memory_output(gen, root, layout, fmt):
+    memory = gen.MemoryOutput()
+    gen.write_archive(layout, memory)
+
+    files, dirs = read_archive(archive_bytes(gen, layout, fmt), fmt)
+
+    assert files == memory.files
+    assert dirs == memory.dirs
+
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_archive_is_byte_identical_across_runs(gen, root, layout, fmt):
+    assert archive_bytes(gen, layout, fmt) == archive_bytes(gen, layout, fmt)
+
+
+def test_archive_matches_generated_tree(gen, root, layout):
+    gen.main(["--root", str(root), "--no-cache", "--workers", "1"])
+    on_disk = {
+        f"{root.name}/{path.relative_to(root).as_posix()}": path.read_bytes()
+        for path in root.rglob("*")
+        if path.is_file() and not path.name.startswith(".tryatlabs-")
+    }
+
+    memory = gen.MemoryOutput()
+    gen.write_archive(gen.with_sitemaps(layout, layout["content"], gz=True), memory)
+
+    assert memory.files == on_disk